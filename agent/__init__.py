@@ -2,10 +2,24 @@
 Advanced AI Agent with Continuous Learning and Memory
 """
 
-from .core.agent import AdvancedAgent
-from .memory.memory_manager import MemoryManager
-from .learning.continuous_learner import ContinuousLearner
-from .knowledge.knowledge_graph import KnowledgeGraph
+import importlib
 
 __version__ = "0.1.0"
 __all__ = ["AdvancedAgent", "MemoryManager", "ContinuousLearner", "KnowledgeGraph"]
+
+# Lazy imports so that `import agent` does not pull in heavy subsystems
+_LAZY = {
+    "AdvancedAgent": ("agent.core.agent", "AdvancedAgent"),
+    "MemoryManager": ("agent.memory.memory_manager", "MemoryManager"),
+    "ContinuousLearner": ("agent.learning.continuous_learner", "ContinuousLearner"),
+    "KnowledgeGraph": ("agent.knowledge.knowledge_graph", "KnowledgeGraph"),
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attr = _LAZY[name]
+    value = getattr(importlib.import_module(module_name), attr)
+    globals()[name] = value
+    return value
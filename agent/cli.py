@@ -2,25 +2,26 @@
 Command-line interface for the Advanced AI Agent
 """
 
+import sys
 import typer
-import json
 from typing import Optional
-from rich.console import Console
-from rich.panel import Panel
-from rich.table import Table
-from rich.progress import Progress, SpinnerColumn, TextColumn
-from rich.prompt import Prompt
-from pathlib import Path
-import time
 
-from .core.config import load_config, AgentConfig
-from .core.agent import AdvancedAgent
+# Heavy imports (rich, the agent itself) are deferred into the command bodies
+# so that `--help` and argument errors only pay for typer.
 
-app = typer.Typer(help="Advanced AI Agent with Continuous Learning and Memory")
-console = Console()
+APP_HELP = "Advanced AI Agent with Continuous Learning and Memory"
+_console = None
+
+
+def _get_console():
+    """Return the shared rich console, creating it on first use"""
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console()
+    return _console
 
 
-@app.command()
 def chat(
     config_file: Optional[str] = typer.Option(None, "--config", "-c", help="Configuration file path"),
     memory_path: Optional[str] = typer.Option("./memory", "--memory", "-m", help="Memory storage path"),
@@ -28,6 +29,14 @@ def chat(
 ):
     """Start an interactive chat session with the agent"""
     
+    import time
+    from rich.panel import Panel
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+    from rich.prompt import Prompt
+    from .core.config import load_config
+    from .core.agent import AdvancedAgent
+    
+    console = _get_console()
     console.print(Panel.fit("🤖 Advanced AI Agent Chat", style="bold blue"))
     
     # Load configuration
@@ -56,57 +65,42 @@ def chat(
     console.print("[dim]Type 'help' for available commands.[/dim]")
     console.print()
     
+    # One spinner for the whole session; it is only live while the agent is
+    # thinking so that it does not interfere with the input prompt. It is
+    # drawn once per turn rather than animated: without auto refresh,
+    # start()/stop() do not spawn and join a refresh thread every turn.
+    thinking = Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        console=console,
+        transient=True,
+        auto_refresh=False
+    )
+    
     # Main chat loop
     while True:
         try:
             user_input = Prompt.ask("[bold blue]You[/bold blue]")
-            
-            if user_input.lower() in ["quit", "exit", "q"]:
-                console.print("[yellow]Goodbye! Shutting down agent...[/yellow]")
-                agent.shutdown()
-                break
-                
-            elif user_input.lower() == "help":
-                _show_chat_help()
+            if not user_input.strip():
                 continue
                 
-            elif user_input.lower() == "stats":
-                _show_agent_stats(agent)
-                continue
-                
-            elif user_input.lower() == "memory":
-                _show_memory_info(agent)
-                continue
-                
-            elif user_input.lower().startswith("feedback "):
-                feedback_text = user_input[9:].strip()
-                if feedback_text:
-                    feedback = {"comment": feedback_text, "rating": 0.7}
-                    agent.learn(feedback)
-                    console.print("[green]✓ Feedback recorded. Thank you![/green]")
-                continue
-                
-            elif user_input.lower().startswith("remember "):
-                knowledge_text = user_input[9:].strip()
-                if knowledge_text:
-                    knowledge = {
-                        "type": "fact",
-                        "statement": knowledge_text,
-                        "importance": 0.8
-                    }
-                    agent.add_knowledge(knowledge)
-                    console.print("[green]✓ Knowledge added to memory.[/green]")
+            # Dispatch chat commands; anything else goes to the agent
+            command, separator, argument = user_input.partition(" ")
+            entry = _CHAT_COMMANDS.get(command.lower())
+            if entry and bool(separator) == entry[1]:
+                if entry[0](agent, argument):
+                    break
                 continue
                 
             # Process user input
-            with Progress(
-                SpinnerColumn(),
-                TextColumn("[progress.description]{task.description}"),
-                console=console,
-                transient=True
-            ) as progress:
-                task = progress.add_task("Thinking...", total=None)
+            thinking.start()
+            task = thinking.add_task("Thinking...", total=None)
+            thinking.refresh()
+            try:
                 response = agent.process(user_input)
+            finally:
+                thinking.remove_task(task)
+                thinking.stop()
                 
             # Display response
             console.print(f"[bold green]{config.name}[/bold green]: {response['response']}")
@@ -123,7 +117,6 @@ def chat(
             console.print(f"[red]Error: {e}[/red]")
 
 
-@app.command()
 def query(
     query_text: str,
     config_file: Optional[str] = typer.Option(None, "--config", "-c", help="Configuration file path"),
@@ -133,6 +126,11 @@ def query(
 ):
     """Query agent's memory"""
     
+    from rich.table import Table
+    from .core.config import load_config
+    from .core.agent import AdvancedAgent
+    
+    console = _get_console()
     config = load_config(config_file) if config_file else load_config()
     agent = AdvancedAgent(config, memory_path)
     
@@ -151,7 +149,8 @@ def query(
         table.add_column("Importance", style="green")
         
         for result in results:
-            content = str(result.get("content", ""))[:100] + "..." if len(str(result.get("content", ""))) > 100 else str(result.get("content", ""))
+            raw = str(result.get("content", ""))
+            content = raw[:100] + "..." if len(raw) > 100 else raw
             table.add_row(
                 result.get("type", "unknown"),
                 content,
@@ -162,17 +161,24 @@ def query(
         console.print(table)
         
     finally:
-        agent.shutdown()
+        agent.shutdown(maintain=False)
 
 
-@app.command()
 def stats(
     config_file: Optional[str] = typer.Option(None, "--config", "-c", help="Configuration file path"),
     memory_path: Optional[str] = typer.Option("./memory", "--memory", "-m", help="Memory storage path"),
-    export_file: Optional[str] = typer.Option(None, "--export", "-e", help="Export statistics to file")
+    export_file: Optional[str] = typer.Option(None, "--export", "-e", help="Export statistics to file"),
+    quiet: bool = typer.Option(False, "--quiet", "-q", help="Don't print statistics when exporting")
 ):
     """Show agent statistics"""
     
+    import json
+    from .core.config import load_config
+    from .core.agent import AdvancedAgent
+    
+    # Quiet exports never touch the console
+    silent = quiet and export_file is not None
+    
     config = load_config(config_file) if config_file else load_config()
     agent = AdvancedAgent(config, memory_path)
     
@@ -180,19 +186,20 @@ def stats(
         statistics = agent.get_statistics()
         
         # Display statistics
-        _show_detailed_stats(statistics)
+        if not silent:
+            _show_detailed_stats(statistics)
         
         # Export if requested
         if export_file:
             with open(export_file, 'w') as f:
                 json.dump(statistics, f, indent=2, default=str)
-            console.print(f"[green]Statistics exported to: {export_file}[/green]")
+            if not silent:
+                _get_console().print(f"[green]Statistics exported to: {export_file}[/green]")
             
     finally:
-        agent.shutdown()
+        agent.shutdown(maintain=False)
 
 
-@app.command()
 def export(
     output_file: str,
     config_file: Optional[str] = typer.Option(None, "--config", "-c", help="Configuration file path"),
@@ -200,6 +207,10 @@ def export(
 ):
     """Export agent memory to file"""
     
+    from .core.config import load_config
+    from .core.agent import AdvancedAgent
+    
+    console = _get_console()
     config = load_config(config_file) if config_file else load_config()
     agent = AdvancedAgent(config, memory_path)
     
@@ -208,10 +219,9 @@ def export(
         console.print(f"[green]Memory exported to: {output_file}[/green]")
         
     finally:
-        agent.shutdown()
+        agent.shutdown(maintain=False)
 
 
-@app.command()
 def import_memory(
     input_file: str,
     config_file: Optional[str] = typer.Option(None, "--config", "-c", help="Configuration file path"),
@@ -219,6 +229,11 @@ def import_memory(
 ):
     """Import agent memory from file"""
     
+    from pathlib import Path
+    from .core.config import load_config
+    from .core.agent import AdvancedAgent
+    
+    console = _get_console()
     if not Path(input_file).exists():
         console.print(f"[red]File not found: {input_file}[/red]")
         raise typer.Exit(1)
@@ -234,7 +249,6 @@ def import_memory(
         agent.shutdown()
 
 
-@app.command()
 def reset(
     memory_path: str = typer.Option("./memory", "--memory", "-m", help="Memory storage path", 
                                    confirmation_prompt=True)
@@ -242,6 +256,10 @@ def reset(
     """Reset agent memory (WARNING: This will delete all stored data!)"""
     
     if typer.confirm("Are you sure you want to reset all agent memory? This cannot be undone."):
+        from .core.config import load_config
+        from .core.agent import AdvancedAgent
+        
+        console = _get_console()
         config = load_config()
         agent = AdvancedAgent(config, memory_path)
         
@@ -253,9 +271,101 @@ def reset(
             agent.shutdown()
 
 
+# Commands are registered on demand by main() so that only the invoked one
+# has its parser built
+_COMMANDS = {
+    "chat": chat,
+    "query": query,
+    "stats": stats,
+    "export": export,
+    "import-memory": import_memory,
+    "reset": reset,
+}
+
+
+def _build_app(command_names) -> typer.Typer:
+    """Build a typer app with only the given commands registered"""
+    
+    app = typer.Typer(help=APP_HELP)
+    
+    # Keep subcommand-style invocation even when a single command is registered
+    @app.callback()
+    def _root():
+        pass
+    
+    for command_name in command_names:
+        app.command(name=command_name)(_COMMANDS[command_name])
+        
+    return app
+
+
+def _chat_quit(agent, argument) -> bool:
+    """End the chat session"""
+    _get_console().print("[yellow]Goodbye! Shutting down agent...[/yellow]")
+    agent.shutdown()
+    return True
+
+
+def _chat_help(agent, argument) -> bool:
+    """Show chat help"""
+    _show_chat_help()
+    return False
+
+
+def _chat_stats(agent, argument) -> bool:
+    """Show agent statistics"""
+    _show_agent_stats(agent)
+    return False
+
+
+def _chat_memory(agent, argument) -> bool:
+    """Show memory information"""
+    _show_memory_info(agent)
+    return False
+
+
+def _chat_feedback(agent, argument) -> bool:
+    """Record feedback from the user"""
+    feedback_text = argument.strip()
+    if feedback_text:
+        feedback = {"comment": feedback_text, "rating": 0.7}
+        agent.learn(feedback)
+        _get_console().print("[green]✓ Feedback recorded. Thank you![/green]")
+    return False
+
+
+def _chat_remember(agent, argument) -> bool:
+    """Add a fact to the agent's knowledge"""
+    knowledge_text = argument.strip()
+    if knowledge_text:
+        knowledge = {
+            "type": "fact",
+            "statement": knowledge_text,
+            "importance": 0.8
+        }
+        agent.add_knowledge(knowledge)
+        _get_console().print("[green]✓ Knowledge added to memory.[/green]")
+    return False
+
+
+# Chat command -> (handler, takes_argument). Handlers return True to end the chat.
+_CHAT_COMMANDS = {
+    "quit": (_chat_quit, False),
+    "exit": (_chat_quit, False),
+    "q": (_chat_quit, False),
+    "help": (_chat_help, False),
+    "stats": (_chat_stats, False),
+    "memory": (_chat_memory, False),
+    "feedback": (_chat_feedback, True),
+    "remember": (_chat_remember, True),
+}
+
+
 def _show_chat_help():
     """Show help for chat commands"""
     
+    from rich.panel import Panel
+    
     help_text = """
     [bold]Available Commands:[/bold]
     
@@ -271,7 +381,7 @@ def _show_chat_help():
     • remember The capital of France is Paris
     """
     
-    console.print(Panel(help_text, title="Chat Commands", border_style="blue"))
+    _get_console().print(Panel(help_text, title="Chat Commands", border_style="blue"))
 
 
 def _show_agent_stats(agent):
@@ -281,9 +391,25 @@ def _show_agent_stats(agent):
     _show_detailed_stats(stats)
 
 
+def _iter_memory_rows(memory_stats):
+    """Yield (label, count, capacity, utilization %) for each memory store"""
+    
+    for memory_type, stats in memory_stats.items():
+        if memory_type == "total_consolidations":
+            continue
+        yield (
+            memory_type.replace("_", " ").title(),
+            stats["count"],
+            stats["capacity"],
+            stats["utilization"] * 100
+        )
+
+
 def _show_memory_info(agent):
     """Show memory information"""
     
+    from rich.table import Table
+    
     memory_stats = agent.memory.get_memory_stats()
     
     table = Table(title="Memory Information")
@@ -292,22 +418,17 @@ def _show_memory_info(agent):
     table.add_column("Capacity", style="white")
     table.add_column("Utilization", style="yellow")
     
-    for memory_type, stats in memory_stats.items():
-        if memory_type != "total_consolidations":
-            utilization = stats["utilization"] * 100
-            table.add_row(
-                memory_type.replace("_", " ").title(),
-                str(stats["count"]),
-                str(stats["capacity"]),
-                f"{utilization:.1f}%"
-            )
+    for label, count, capacity, utilization in _iter_memory_rows(memory_stats):
+        table.add_row(label, str(count), str(capacity), f"{utilization:.1f}%")
     
-    console.print(table)
+    _get_console().print(table)
 
 
 def _show_detailed_stats(statistics):
     """Show detailed statistics"""
     
+    console = _get_console()
+    
     # Agent info
     agent_info = statistics["agent_info"]
     console.print(f"[bold]Agent:[/bold] {agent_info['name']} v{agent_info['version']}")
@@ -325,10 +446,8 @@ def _show_detailed_stats(statistics):
     memory_stats = statistics["memory"]
     console.print("[bold]Memory Usage:[/bold]")
     
-    for memory_type, stats in memory_stats.items():
-        if memory_type != "total_consolidations":
-            utilization = stats["utilization"] * 100
-            console.print(f"  • {memory_type.replace('_', ' ').title()}: {stats['count']}/{stats['capacity']} ({utilization:.1f}%)")
+    for label, count, capacity, utilization in _iter_memory_rows(memory_stats):
+        console.print(f"  • {label}: {count}/{capacity} ({utilization:.1f}%)")
     
     console.print(f"  • Total Consolidations: {memory_stats['total_consolidations']}")
     console.print()
@@ -352,6 +471,13 @@ def _show_detailed_stats(statistics):
 
 def main():
     """Main entry point"""
+    requested = sys.argv[1] if len(sys.argv) > 1 else None
+    
+    if requested in _COMMANDS:
+        app = _build_app([requested])
+    else:
+        app = _build_app(_COMMANDS)
+        
     app()
 
 
@@ -2,8 +2,22 @@
 Core agent framework components
 """
 
-from .agent import AdvancedAgent
-from .config import AgentConfig
-from .state import AgentState
+import importlib
 
 __all__ = ["AdvancedAgent", "AgentConfig", "AgentState"]
+
+# Lazy imports so that importing a submodule does not load the full agent
+_LAZY = {
+    "AdvancedAgent": ("agent.core.agent", "AdvancedAgent"),
+    "AgentConfig": ("agent.core.config", "AgentConfig"),
+    "AgentState": ("agent.core.state", "AgentState"),
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attr = _LAZY[name]
+    value = getattr(importlib.import_module(module_name), attr)
+    globals()[name] = value
+    return value
@@ -5,9 +5,18 @@ Main Advanced Agent class with continuous learning and memory
 import os
 import json
 import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property, lru_cache
 from typing import Dict, Any, List, Optional, Union
 from datetime import datetime
-from loguru import logger
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 from .config import AgentConfig, load_config
 from .state import AgentState, AgentMode, EmotionalState
@@ -20,9 +29,39 @@ TextProcessor = None
 EmotionProcessor = None
 
 
+@lru_cache(maxsize=None)
+def _logger():
+    """Return the loguru logger, importing it on first use"""
+    from loguru import logger
+    return logger
+
+
+def _json_default(obj: Any) -> Any:
+    """Encode the values stdlib json accepts but orjson does not: tuple and float subclasses"""
+    if isinstance(obj, tuple):
+        return list(obj)
+    if isinstance(obj, float):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _dumps(obj: Any) -> bytes:
+    """Serialize an object to compact JSON bytes, accepting what stdlib json does"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj).encode("utf-8")
+
+
 class AdvancedAgent:
     """Advanced AI agent with memory, learning, and reasoning capabilities"""
     
+    # Confidence adjustment per emotional state
+    _EMOTION_CONFIDENCE = {
+        EmotionalState.HAPPY: 0.1,
+        EmotionalState.ENGAGED: 0.1,
+        EmotionalState.CONFUSED: -0.2,
+    }
+    
     def __init__(self, config: Optional[AgentConfig] = None, memory_path: Optional[str] = None):
         # Load configuration
         self.config = config or load_config()
@@ -35,77 +74,142 @@ class AdvancedAgent:
         self.learner = ContinuousLearner(self.config.learning)
         self.knowledge = KnowledgeGraph(self.config.knowledge, self.config.memory_path)
         
-        # Initialize processors (lazy loading to avoid dependency issues)
-        self.text_processor = None
-        self.emotion_processor = None
-        self._init_processors()
+        # Load existing state if available
+        self._load_state()
         
         # Performance tracking
         self.interaction_count = 0
-        self.start_time = datetime.now()
-        
-    def _init_processors(self):
-        """Initialize processors with graceful fallback if dependencies missing"""
+        self.start_time = datetime.now()  # Wall clock, for display
+        self.start_time_mono = time.perf_counter()  # Monotonic, for uptime
+        self._unsaved_since = 0
+        
+        # Writes since the last maintenance pass, used to skip no-op passes
+        self._dirty_memory = 0
+        self._dirty_knowledge = 0
+        
+        # Guards memory, state, learner, knowledge and the counters above,
+        # which callers and the background writer both change
+        self._lock = threading.RLock()
+        
+        # Interaction side effects (learning, persistence) are applied by a
+        # background writer so process() can return as soon as possible
+        self._write_queue: queue.Queue = queue.Queue()
+        self._writer_thread = threading.Thread(
+            target=self._drain_writes, name="agent-writer", daemon=True
+        )
+        self._writer_thread.start()
+        
+        # Worker pool for the independent analysis steps in process()
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="agent-process")
+        
+        _logger().info(f"Advanced agent '{self.config.name}' initialized")
+        
+    @cached_property
+    def text_processor(self):
+        """Text processor, imported on first use; None if dependencies are missing"""
         try:
             from ..processors.text_processor import TextProcessor
-            self.text_processor = TextProcessor(self.config)
-            logger.info("Text processor initialized")
+            processor = TextProcessor(self.config)
+            _logger().info("Text processor initialized")
+            return processor
         except Exception as e:
-            logger.warning(f"Text processor not available: {e}")
-            self.text_processor = None
+            _logger().warning(f"Text processor not available: {e}")
+            return None
             
+    @cached_property
+    def emotion_processor(self):
+        """Emotion processor, imported on first use; None if dependencies are missing"""
         try:
             from ..processors.emotion_processor import EmotionProcessor
-            self.emotion_processor = EmotionProcessor()
-            logger.info("Emotion processor initialized")
+            processor = EmotionProcessor()
+            _logger().info("Emotion processor initialized")
+            return processor
         except Exception as e:
-            logger.warning(f"Emotion processor not available: {e}")
-            self.emotion_processor = None
-        
-        # Load existing state if available
-        self._load_state()
-        
-        logger.info(f"Advanced agent '{self.config.name}' initialized")
-        
+            _logger().warning(f"Emotion processor not available: {e}")
+            return None
+            
     def _load_state(self):
         """Load agent state from disk"""
         state_file = os.path.join(self.config.memory_path, "agent_state.json")
         
         if os.path.exists(state_file):
             try:
-                with open(state_file, 'r') as f:
-                    state_data = json.load(f)
-                self.state.from_dict(state_data)
-                logger.info("Agent state loaded from disk")
+                with open(state_file, 'rb') as f:
+                    raw = f.read()
+                self.state = AgentState.from_bytes(raw)
+                _logger().info("Agent state loaded from disk")
             except Exception as e:
-                logger.warning(f"Failed to load agent state: {e}")
+                _logger().warning(f"Failed to load agent state: {e}")
                 
-    def _save_state(self):
-        """Save agent state to disk"""
-        state_file = os.path.join(self.config.memory_path, "agent_state.json")
-        
-        try:
-            with open(state_file, 'w') as f:
-                json.dump(self.state.to_dict(), f, indent=2)
-            logger.debug("Agent state saved to disk")
-        except Exception as e:
-            logger.warning(f"Failed to save agent state: {e}")
+    def _save_state(self, force: bool = False):
+        """Save agent state to disk, at most once every `save_every` changes unless forced"""
+        with self._lock:
+            if not force and self._unsaved_since < self.config.save_every:
+                return
+                
+            state_file = os.path.join(self.config.memory_path, "agent_state.json")
+            
+            try:
+                # Serialize first, then write a temp file and swap it in so a
+                # crash never leaves a half-written state file behind
+                data = self.state.dumps()
+                tmp_file = state_file + ".tmp"
+                with open(tmp_file, 'wb', buffering=64 * 1024) as f:
+                    f.write(data)
+                os.replace(tmp_file, state_file)
+                self._unsaved_since = 0
+                _logger().debug("Agent state saved to disk")
+            except Exception as e:
+                _logger().warning(f"Failed to save agent state: {e}")
             
     def process(self, input_text: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Process input and generate response"""
         
-        self.state.update_mode(AgentMode.PROCESSING)
-        self.interaction_count += 1
-        
+        # Nothing to process for empty or whitespace-only input
+        if not input_text or not input_text.strip():
+            with self._lock:
+                agent_state = self.state.get_context_summary()
+            return {
+                "response": "",
+                "confidence": 0.0,
+                "memory_id": None,
+                "agent_state": agent_state
+            }
+            
+        with self._lock:
+            self.state.update_mode(AgentMode.PROCESSING)
+            self.interaction_count += 1
+            interaction_number = self.interaction_count
+            
         try:
             # Add context if provided
             if context:
-                for key, value in context.items():
-                    self.state.add_context(key, value)
-                    
+                with self._lock:
+                    for key, value in context.items():
+                        self.state.add_context(key, value)
+                        
+            # Text and emotion analysis only read the input, so run them on
+            # the pool while memory and knowledge are queried here under the
+            # lock, since the background writer changes both
+            text_future = (
+                self._executor.submit(self.text_processor.process, input_text)
+                if self.text_processor else None
+            )
+            emotion_future = (
+                self._executor.submit(self.emotion_processor.analyze, input_text)
+                if self.emotion_processor else None
+            )
+            
+            with self._lock:
+                # Retrieve relevant memories
+                relevant_memories = self.memory.retrieve_memory(input_text, limit=5)
+                
+                # Query knowledge graph
+                knowledge_insights = self.knowledge.query(input_text)
+                
             # Process input text
-            if self.text_processor:
-                processed_input = self.text_processor.process(input_text)
+            if text_future:
+                processed_input = text_future.result()
             else:
                 # Fallback text processing
                 processed_input = {
@@ -116,11 +220,12 @@ class AdvancedAgent:
                 }
             
             # Analyze emotional content
-            if self.emotion_processor:
-                emotional_analysis = self.emotion_processor.analyze(input_text)
-                self.state.update_emotional_state(
-                    EmotionalState(emotional_analysis.get("dominant_emotion", "neutral"))
-                )
+            if emotion_future:
+                emotional_analysis = emotion_future.result()
+                with self._lock:
+                    self.state.update_emotional_state(
+                        EmotionalState(emotional_analysis.get("dominant_emotion", "neutral"))
+                    )
             else:
                 # Fallback emotional analysis
                 emotional_analysis = {
@@ -129,73 +234,122 @@ class AdvancedAgent:
                     "intensity": {"overall": 0.5}
                 }
             
-            # Retrieve relevant memories
-            relevant_memories = self.memory.retrieve_memory(input_text, limit=5)
-            
-            # Query knowledge graph
-            knowledge_insights = self.knowledge.query(input_text)
-            
-            # Generate response using learning model
-            response_data = self._generate_response(
-                processed_input, 
-                relevant_memories, 
-                knowledge_insights,
-                emotional_analysis
-            )
-            
-            # Store interaction in memory
-            interaction = {
-                "input": input_text,
-                "response": response_data["response"],
-                "emotional_analysis": emotional_analysis,
-                "memories_used": len(relevant_memories),
-                "knowledge_used": len(knowledge_insights),
-                "context": context or {}
-            }
-            
-            memory_id = self.memory.add_memory(
-                interaction, 
-                "episodic", 
-                importance=response_data.get("confidence", 0.5)
-            )
-            
-            # Update agent state
-            self.state.add_interaction(interaction)
-            self.state.update_performance_metric("response_time", response_data.get("processing_time", 0))
-            
-            # Learn from this interaction
-            self.learner.learn_from_interaction(interaction)
-            
-            # Periodic maintenance
-            if self.interaction_count % 10 == 0:
-                self._perform_maintenance()
+            with self._lock:
+                # Generate response using learning model
+                response_data = self._generate_response(
+                    processed_input, 
+                    relevant_memories, 
+                    knowledge_insights,
+                    emotional_analysis
+                )
+                
+                # Store the interaction in memory and state now, so its id is
+                # returned and the summary and the next turn's history include
+                # it; learning and saving are left to the background writer
+                interaction = {
+                    "input": input_text,
+                    "response": response_data["response"],
+                    "emotional_analysis": emotional_analysis,
+                    "memories_used": len(relevant_memories),
+                    "knowledge_used": len(knowledge_insights),
+                    "context": context or {}
+                }
+                
+                memory_id = self.memory.add_memory(
+                    interaction, 
+                    "episodic", 
+                    importance=response_data.get("confidence", 0.5)
+                )
+                self._dirty_memory += 1
+                
+                self.state.add_interaction(interaction)
+                self.state.update_performance_metric(
+                    "response_time", response_data.get("processing_time", 0)
+                )
+                self._write_queue.put((interaction_number, interaction))
+                
+                response_data["memory_id"] = memory_id
+                response_data["agent_state"] = self.state.get_context_summary()
                 
-            response_data["memory_id"] = memory_id
-            response_data["agent_state"] = self.state.get_context_summary()
-            
             return response_data
             
         except Exception as e:
-            logger.error(f"Error processing input: {e}")
-            self.state.update_emotional_state(EmotionalState.CONFUSED)
+            _logger().error(f"Error processing input: {e}")
             
+            with self._lock:
+                self.state.update_emotional_state(EmotionalState.CONFUSED)
+                agent_state = self.state.get_context_summary()
+                
             return {
                 "response": "I'm having trouble processing that. Could you please rephrase?",
                 "confidence": 0.1,
                 "error": str(e),
-                "agent_state": self.state.get_context_summary()
+                "agent_state": agent_state
             }
         finally:
-            self.state.update_mode(AgentMode.IDLE)
+            with self._lock:
+                self.state.update_mode(AgentMode.IDLE)
+            
+    def _record_interaction(self, interaction_number: int, interaction: Dict[str, Any]) -> None:
+        """Learn from an interaction already stored in memory and state"""
+        
+        with self._lock:
+            # Learn from this interaction
+            self.learner.learn_from_interaction(interaction)
+            self._unsaved_since += 1
+            
+            # Periodic maintenance
+            if interaction_number % 10 == 0:
+                self._perform_maintenance()
+            
+    def _drain_writes(self) -> None:
+        """Apply queued interaction writes in batches until a stop sentinel arrives"""
+        
+        while True:
+            batch = [self._write_queue.get()]
+            
+            # Collect anything else that arrives within a short window
+            deadline = time.monotonic() + 0.05
+            while len(batch) < 32 and batch[-1] is not None:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._write_queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+                    
+            stop = False
+            for item in batch:
+                try:
+                    if item is None:
+                        stop = True
+                    else:
+                        self._record_interaction(*item)
+                except Exception as e:
+                    _logger().error(f"Error recording interaction: {e}")
+                finally:
+                    self._write_queue.task_done()
+                    
+            # One state save per batch rather than per interaction
             self._save_state()
             
+            if stop:
+                return
+                
+    def flush_writes(self) -> None:
+        """Block until all queued interaction writes have been applied"""
+        
+        if self._writer_thread.is_alive():
+            self._write_queue.join()
+            
     def _generate_response(self, processed_input: Dict[str, Any], 
                           memories: List[Dict[str, Any]], 
                           knowledge: List[Dict[str, Any]],
                           emotional_analysis: Dict[str, Any]) -> Dict[str, Any]:
         """Generate response based on input, memories, and knowledge"""
         
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         # Combine context information
         context = {
@@ -204,7 +358,7 @@ class AdvancedAgent:
             "knowledge": knowledge,
             "emotional_state": self.state.emotional_state.value,
             "emotional_analysis": emotional_analysis,
-            "conversation_history": self.state.interaction_history[-5:]  # Last 5 interactions
+            "conversation_history": self.state.recent_interactions(5)  # Last 5 interactions
         }
         
         # Generate response using the learning model
@@ -213,7 +367,7 @@ class AdvancedAgent:
         # Calculate confidence
         confidence = self._calculate_response_confidence(context, response)
         
-        processing_time = time.time() - start_time
+        processing_time = time.perf_counter() - start_time
         
         return {
             "response": response,
@@ -227,223 +381,265 @@ class AdvancedAgent:
     def _calculate_response_confidence(self, context: Dict[str, Any], response: str) -> float:
         """Calculate confidence score for the response"""
         
-        confidence = 0.5  # Base confidence
+        # Base confidence, boosted by relevant memories/knowledge and emotional state
+        confidence = (
+            0.5
+            + 0.2 * bool(context["memories"])
+            + 0.2 * bool(context["knowledge"])
+            + self._EMOTION_CONFIDENCE.get(self.state.emotional_state, 0.0)
+        )
         
-        # Boost confidence if we have relevant memories
-        if context["memories"]:
-            confidence += 0.2
-            
-        # Boost confidence if we have relevant knowledge
-        if context["knowledge"]:
-            confidence += 0.2
-            
-        # Adjust based on emotional state
-        if self.state.emotional_state in [EmotionalState.HAPPY, EmotionalState.ENGAGED]:
-            confidence += 0.1
-        elif self.state.emotional_state == EmotionalState.CONFUSED:
-            confidence -= 0.2
-            
-        return min(1.0, max(0.0, confidence))
+        return 0.0 if confidence < 0.0 else (1.0 if confidence > 1.0 else confidence)
         
     def _perform_maintenance(self):
-        """Perform periodic maintenance tasks"""
-        
-        logger.info("Performing agent maintenance")
-        
-        # Memory consolidation
-        self.memory.consolidate_memories()
+        """Perform periodic maintenance tasks on subsystems that changed"""
         
-        # Memory forgetting
-        self.memory.forget_memories()
-        
-        # Learning model optimization
-        self.learner.optimize_model()
-        
-        # Knowledge graph cleanup
-        self.knowledge.cleanup()
+        with self._lock:
+            if not (self._dirty_memory or self._dirty_knowledge):
+                _logger().debug("Skipping agent maintenance, nothing changed")
+                return
+                
+            _logger().info("Performing agent maintenance")
+            
+            if self._dirty_memory:
+                # Memory consolidation
+                self.memory.consolidate_memories()
+                
+                # Memory forgetting
+                self.memory.forget_memories()
+                
+                # Learning model optimization
+                self.learner.optimize_model()
+                self._dirty_memory = 0
+                
+            if self._dirty_knowledge:
+                # Knowledge graph cleanup
+                self.knowledge.cleanup()
+                self._dirty_knowledge = 0
+                
+            self._save_state()
+            
+    def _persist(self) -> None:
+        """Save agent, memory and knowledge state to disk"""
         
-        # Save all states
-        self.memory.save_state()
-        self.knowledge.save_state()
+        with self._lock:
+            self._save_state(force=True)
+            self.memory.save_state()
+            self.knowledge.save_state()
         
     def learn(self, feedback: Dict[str, Any]) -> None:
         """Learn from explicit feedback"""
         
-        self.state.update_mode(AgentMode.LEARNING)
-        
-        try:
-            # Process feedback
-            processed_feedback = self.learner.process_feedback(feedback)
-            
-            # Update learning model
-            self.learner.update_from_feedback(processed_feedback)
-            
-            # Store feedback in memory
-            self.memory.add_memory(
-                {
-                    "type": "feedback",
-                    "feedback": feedback,
-                    "processed_feedback": processed_feedback,
-                    "timestamp": datetime.now().isoformat()
-                },
-                "semantic",
-                importance=0.8
-            )
-            
-            logger.info("Agent learned from feedback")
+        with self._lock:
+            self.state.update_mode(AgentMode.LEARNING)
             
-        except Exception as e:
-            logger.error(f"Error learning from feedback: {e}")
-        finally:
-            self.state.update_mode(AgentMode.IDLE)
-            self._save_state()
+            try:
+                # Process feedback
+                processed_feedback = self.learner.process_feedback(feedback)
+                
+                # Update learning model
+                self.learner.update_from_feedback(processed_feedback)
+                
+                # Store feedback in memory
+                self.memory.add_memory(
+                    {
+                        "type": "feedback",
+                        "feedback": feedback,
+                        "processed_feedback": processed_feedback,
+                        "timestamp": datetime.now().isoformat()
+                    },
+                    "semantic",
+                    importance=0.8
+                )
+                self._dirty_memory += 1
+                
+                _logger().info("Agent learned from feedback")
+                
+            except Exception as e:
+                _logger().error(f"Error learning from feedback: {e}")
+            finally:
+                self.state.update_mode(AgentMode.IDLE)
+                self._unsaved_since += 1
+                self._save_state()
             
     def add_knowledge(self, knowledge_item: Dict[str, Any]) -> str:
         """Add new knowledge to the agent"""
         
         try:
-            # Add to knowledge graph
-            entity_id = self.knowledge.add_entity(knowledge_item)
-            
-            # Also store in semantic memory
-            self.memory.add_memory(
-                knowledge_item,
-                "semantic",
-                importance=knowledge_item.get("importance", 0.7)
-            )
-            
-            logger.info(f"Added knowledge entity: {entity_id}")
+            with self._lock:
+                # Add to knowledge graph
+                entity_id = self.knowledge.add_entity(knowledge_item)
+                self._dirty_knowledge += 1
+                
+                # Also store in semantic memory
+                self.memory.add_memory(
+                    knowledge_item,
+                    "semantic",
+                    importance=knowledge_item.get("importance", 0.7)
+                )
+                self._dirty_memory += 1
+                
+            _logger().info(f"Added knowledge entity: {entity_id}")
             return entity_id
             
         except Exception as e:
-            logger.error(f"Error adding knowledge: {e}")
+            _logger().error(f"Error adding knowledge: {e}")
             raise
             
     def query_memory(self, query: str, memory_type: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
         """Query agent's memory"""
         
-        return self.memory.retrieve_memory(query, memory_type, limit)
-        
+        self.flush_writes()
+        with self._lock:
+            return self.memory.retrieve_memory(query, memory_type, limit)
+            
     def query_knowledge(self, query: str) -> List[Dict[str, Any]]:
         """Query agent's knowledge graph"""
         
-        return self.knowledge.query(query)
-        
+        self.flush_writes()
+        with self._lock:
+            return self.knowledge.query(query)
+            
     def get_statistics(self) -> Dict[str, Any]:
         """Get comprehensive statistics about the agent"""
         
-        uptime = datetime.now() - self.start_time
+        self.flush_writes()
+        uptime_seconds = time.perf_counter() - self.start_time_mono
         
-        return {
-            "agent_info": {
-                "name": self.config.name,
-                "version": self.config.version,
-                "uptime_hours": uptime.total_seconds() / 3600,
-                "total_interactions": self.interaction_count
-            },
-            "state": self.state.get_context_summary(),
-            "memory": self.memory.get_memory_stats(),
-            "learning": self.learner.get_statistics(),
-            "knowledge": self.knowledge.get_statistics()
-        }
+        with self._lock:
+            return {
+                "agent_info": {
+                    "name": self.config.name,
+                    "version": self.config.version,
+                    "uptime_hours": uptime_seconds / 3600,
+                    "total_interactions": self.interaction_count
+                },
+                "state": self.state.get_context_summary(),
+                "memory": self.memory.get_memory_stats(),
+                "learning": self.learner.get_statistics(),
+                "knowledge": self.knowledge.get_statistics()
+            }
         
     def export_memory(self, filepath: str) -> None:
         """Export agent's memory to file"""
         
+        self.flush_writes()
+        
         try:
-            export_data = {
-                "timestamp": datetime.now().isoformat(),
-                "agent_info": {
+            # Serialize one section at a time so the whole export is never
+            # held in memory as a single object or string
+            sections = [
+                (b'{"timestamp":', lambda: datetime.now().isoformat()),
+                (b',"agent_info":', lambda: {
                     "name": self.config.name,
                     "version": self.config.version,
                     "interactions": self.interaction_count
-                },
-                "state": self.state.to_dict(),
-                "memory": {
-                    "short_term": self.memory.short_term.to_dict(),
-                    "episodic": self.memory.episodic.to_dict(),
-                    "semantic": self.memory.semantic.to_dict()
-                },
-                "knowledge": self.knowledge.to_dict()
-            }
-            
-            with open(filepath, 'w') as f:
-                json.dump(export_data, f, indent=2)
+                }),
+                (b',"state":', self.state.to_dict),
+                (b',"memory":{"short_term":', self.memory.short_term.to_dict),
+                (b',"episodic":', self.memory.episodic.to_dict),
+                (b',"semantic":', self.memory.semantic.to_dict),
+                (b'},"knowledge":', self.knowledge.to_dict),
+            ]
+            
+            tmp_path = filepath + ".tmp"
+            with self._lock, open(tmp_path, 'wb', buffering=1 << 20) as f:
+                for prefix, produce in sections:
+                    f.write(prefix)
+                    f.write(_dumps(produce()))
+                f.write(b'}')
+            os.replace(tmp_path, filepath)
                 
-            logger.info(f"Memory exported to {filepath}")
+            _logger().info(f"Memory exported to {filepath}")
             
         except Exception as e:
-            logger.error(f"Error exporting memory: {e}")
+            _logger().error(f"Error exporting memory: {e}")
             raise
             
     def import_memory(self, filepath: str) -> None:
         """Import memory from file"""
         
+        self.flush_writes()
+        
         try:
             with open(filepath, 'r') as f:
                 import_data = json.load(f)
                 
-            # Import state
-            if "state" in import_data:
-                self.state.from_dict(import_data["state"])
-                
-            # Import memory
-            if "memory" in import_data:
-                memory_data = import_data["memory"]
-                
-                if "short_term" in memory_data:
-                    self.memory.short_term.from_dict(memory_data["short_term"])
+            with self._lock:
+                # Import state
+                if "state" in import_data:
+                    self.state.from_dict(import_data["state"])
                     
-                if "episodic" in memory_data:
-                    self.memory.episodic.from_dict(memory_data["episodic"])
+                # Import memory
+                if "memory" in import_data:
+                    memory_data = import_data["memory"]
                     
-                if "semantic" in memory_data:
-                    self.memory.semantic.from_dict(memory_data["semantic"])
-                    
-            # Import knowledge
-            if "knowledge" in import_data:
-                self.knowledge.from_dict(import_data["knowledge"])
+                    if "short_term" in memory_data:
+                        self.memory.short_term.from_dict(memory_data["short_term"])
+                        
+                    if "episodic" in memory_data:
+                        self.memory.episodic.from_dict(memory_data["episodic"])
+                        
+                    if "semantic" in memory_data:
+                        self.memory.semantic.from_dict(memory_data["semantic"])
+                        
+                # Import knowledge
+                if "knowledge" in import_data:
+                    self.knowledge.from_dict(import_data["knowledge"])
                 
-            logger.info(f"Memory imported from {filepath}")
+            _logger().info(f"Memory imported from {filepath}")
             
         except Exception as e:
-            logger.error(f"Error importing memory: {e}")
+            _logger().error(f"Error importing memory: {e}")
             raise
             
     def reset(self) -> None:
         """Reset agent to initial state"""
         
-        logger.warning("Resetting agent to initial state")
-        
-        # Clear memory
-        self.memory.short_term.clear()
-        self.memory.episodic.episodes.clear()
-        self.memory.semantic.concepts.clear()
-        self.memory.semantic.facts.clear()
+        _logger().warning("Resetting agent to initial state")
         
-        # Reset state
-        self.state = AgentState()
+        self.flush_writes()
         
-        # Reset counters
-        self.interaction_count = 0
-        self.start_time = datetime.now()
+        with self._lock:
+            # Clear memory
+            self.memory.short_term.clear()
+            self.memory.episodic.episodes.clear()
+            self.memory.semantic.concepts.clear()
+            self.memory.semantic.facts.clear()
+            
+            # Reset state
+            self.state = AgentState()
+            
+            # Reset counters
+            self.interaction_count = 0
+            self.start_time = datetime.now()
+            self.start_time_mono = time.perf_counter()
+            
+            # Save reset state
+            self._save_state(force=True)
+            
+        _logger().info("Agent reset completed")
         
-        # Save reset state
-        self._save_state()
+    def shutdown(self, maintain: bool = True) -> None:
+        """Properly shutdown the agent
         
-        logger.info("Agent reset completed")
+        Pass maintain=False to skip the final maintenance pass, e.g. after
+        read-only operations.
+        """
         
-    def shutdown(self) -> None:
-        """Properly shutdown the agent"""
+        _logger().info("Shutting down agent")
         
-        logger.info("Shutting down agent")
+        # Apply pending interaction writes and stop the writer
+        if self._writer_thread.is_alive():
+            self._write_queue.put(None)
+            self._writer_thread.join()
+        self._executor.shutdown(wait=True)
         
         # Perform final maintenance
-        self._perform_maintenance()
+        if maintain:
+            self._perform_maintenance()
         
         # Save all states
-        self._save_state()
-        self.memory.save_state()
-        self.knowledge.save_state()
+        self._persist()
         
-        logger.info("Agent shutdown completed")
+        _logger().info("Agent shutdown completed")
@@ -4,10 +4,11 @@ Configuration management for the AI agent
 
 from typing import Dict, Any, Optional
 from pydantic import BaseModel, Field
+import functools
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+# .env is read on the first load_config() call rather than at import
+_DOTENV_LOADED = False
 
 
 class MemoryConfig(BaseModel):
@@ -35,6 +36,9 @@ class KnowledgeConfig(BaseModel):
     max_relations: int = Field(default=500000, description="Maximum number of relations")
     similarity_threshold: float = Field(default=0.8, description="Threshold for entity similarity")
     reasoning_depth: int = Field(default=3, description="Maximum depth for reasoning")
+    flush_interval: float = Field(default=300.0, description="Seconds between knowledge graph snapshots")
+    flush_batch_size: int = Field(default=1000, description="Logged changes that force a knowledge graph snapshot")
+    reasoning_cache_dir: Optional[str] = Field(default=None, description="Directory for the on-disk inference cache (disabled if unset)")
 
 
 class AgentConfig(BaseModel):
@@ -43,6 +47,7 @@ class AgentConfig(BaseModel):
     version: str = Field(default="0.1.0", description="Agent version")
     memory_path: str = Field(default="./memory", description="Path to store memory data")
     log_level: str = Field(default="INFO", description="Logging level")
+    save_every: int = Field(default=10, description="Interactions between agent state saves")
     
     # Sub-configurations
     memory: MemoryConfig = Field(default_factory=MemoryConfig)
@@ -58,12 +63,46 @@ class AgentConfig(BaseModel):
         case_sensitive = False
 
 
-def load_config(config_path: Optional[str] = None) -> AgentConfig:
-    """Load configuration from file or environment variables"""
+@functools.lru_cache(maxsize=8)
+def _read_config_file(config_path: str) -> AgentConfig:
+    """Read and validate a configuration file, cached per path"""
+    import json
+    with open(config_path, 'r') as f:
+        return AgentConfig(**json.load(f))
+
+
+def _construct(model_cls, values: Dict[str, Any]):
+    """Build a model from already validated values, skipping validation"""
+    construct = getattr(model_cls, "model_construct", None) or model_cls.construct
+    return construct(**values)
+
+
+def _copy_config(config: AgentConfig) -> AgentConfig:
+    """Copy a validated config field by field without re-validating it"""
+    values = dict(config.__dict__)
+    for name, value in values.items():
+        if isinstance(value, BaseModel):
+            values[name] = _construct(type(value), dict(value.__dict__))
+    return _construct(AgentConfig, values)
+
+
+def load_config(config_path: Optional[str] = None, reload: bool = False) -> AgentConfig:
+    """Load configuration from file or environment variables
+    
+    Files are validated once per path and cached; pass reload=True to re-read
+    from disk. A fresh AgentConfig is returned on every call, so callers may
+    modify it.
+    """
+    global _DOTENV_LOADED
+    if not _DOTENV_LOADED:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _DOTENV_LOADED = True
+        
+    if reload:
+        _read_config_file.cache_clear()
+        
     if config_path and os.path.exists(config_path):
-        import json
-        with open(config_path, 'r') as f:
-            config_data = json.load(f)
-        return AgentConfig(**config_data)
+        return _copy_config(_read_config_file(config_path))
     
     return AgentConfig()
@@ -2,10 +2,61 @@
 Agent state management
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Deque, Mapping, Tuple
+from collections import deque
 from datetime import datetime
 from enum import Enum
+from itertools import islice
+from types import MappingProxyType
 import json
+import time
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Interactions kept in active memory
+MAX_INTERACTION_HISTORY = 100
+
+
+def _json_default(obj: Any) -> Any:
+    """Encode the values stdlib json accepts but orjson does not: tuple and float subclasses"""
+    if isinstance(obj, tuple):
+        return list(obj)
+    if isinstance(obj, float):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+# Coarse clock: mutators within the same millisecond share one datetime.
+# Each cache is a single tuple replaced in one assignment, so threads never
+# see a datetime paired with another refresh's timestamp or ISO string.
+_NOW_GRANULARITY_NS = 1_000_000
+_CLOCK: Optional[Tuple[int, datetime]] = None
+_ISO: Optional[Tuple[datetime, str]] = None
+
+
+def _now_coarse() -> datetime:
+    """Current time, refreshed at most once per millisecond"""
+    global _CLOCK
+    mono = time.monotonic_ns()
+    clock = _CLOCK
+    if clock is None or mono - clock[0] >= _NOW_GRANULARITY_NS:
+        clock = (mono, datetime.now())
+        _CLOCK = clock
+    return clock[1]
+
+
+def _isoformat_coarse(now: datetime) -> str:
+    """ISO string of a datetime, formatted once per refresh of the coarse clock"""
+    global _ISO
+    iso = _ISO
+    if iso is None or iso[0] is not now:
+        iso = (now, now.isoformat())
+        _ISO = iso
+    return iso[1]
 
 
 class AgentMode(Enum):
@@ -29,92 +80,160 @@ class EmotionalState(Enum):
     NEGATIVE = "negative"
 
 
+# Value -> member lookups, avoiding the Enum constructor in from_dict
+_MODE_MAP: Dict[str, AgentMode] = {m.value: m for m in AgentMode}
+_EMO_MAP: Dict[str, EmotionalState] = {m.value: m for m in EmotionalState}
+
+
 class AgentState:
     """Manages the current state of the agent"""
     
+    __slots__ = (
+        "mode",
+        "emotional_state",
+        "_mode_str",
+        "_emo_str",
+        "context",
+        "current_task",
+        "interaction_history",
+        "performance_metrics",
+        "_performance_view",
+        "last_updated",
+    )
+    
     def __init__(self):
         self.mode = AgentMode.IDLE
         self.emotional_state = EmotionalState.NEUTRAL
+        # String values cached alongside the enums for serialization
+        self._mode_str = self.mode.value
+        self._emo_str = self.emotional_state.value
         self.context: Dict[str, Any] = {}
         self.current_task: Optional[str] = None
-        self.interaction_history: List[Dict[str, Any]] = []
+        self.interaction_history: Deque[Dict[str, Any]] = deque(maxlen=MAX_INTERACTION_HISTORY)
         self.performance_metrics: Dict[str, float] = {}
-        self.last_updated = datetime.now()
+        self._performance_view = MappingProxyType(self.performance_metrics)
+        self.last_updated = _now_coarse()
         
     def update_mode(self, new_mode: AgentMode) -> None:
         """Update the agent's operational mode"""
         self.mode = new_mode
-        self.last_updated = datetime.now()
+        self._mode_str = new_mode.value
+        self.last_updated = _now_coarse()
         
     def update_emotional_state(self, new_state: EmotionalState) -> None:
         """Update the agent's emotional state"""
         self.emotional_state = new_state
-        self.last_updated = datetime.now()
+        self._emo_str = new_state.value
+        self.last_updated = _now_coarse()
         
     def add_context(self, key: str, value: Any) -> None:
         """Add context information"""
         self.context[key] = value
-        self.last_updated = datetime.now()
+        self.last_updated = _now_coarse()
         
     def set_current_task(self, task: str) -> None:
         """Set the current task the agent is working on"""
         self.current_task = task
-        self.last_updated = datetime.now()
+        self.last_updated = _now_coarse()
         
     def add_interaction(self, interaction: Dict[str, Any]) -> None:
         """Add an interaction to the history"""
-        interaction['timestamp'] = datetime.now().isoformat()
+        now = _now_coarse()
+        interaction['timestamp'] = _isoformat_coarse(now)
+        # Bounded deque drops the oldest interaction once full
         self.interaction_history.append(interaction)
         
-        # Keep only last 100 interactions in active memory
-        if len(self.interaction_history) > 100:
-            self.interaction_history = self.interaction_history[-100:]
-            
-        self.last_updated = datetime.now()
+        self.last_updated = now
+        
+    def recent_interactions(self, count: int) -> List[Dict[str, Any]]:
+        """Get the most recent interactions, oldest first"""
+        history = self.interaction_history
+        return list(islice(history, max(len(history) - count, 0), None))
         
     def update_performance_metric(self, metric: str, value: float) -> None:
         """Update a performance metric"""
         self.performance_metrics[metric] = value
-        self.last_updated = datetime.now()
+        self.last_updated = _now_coarse()
+        
+    def get_performance_metrics(self) -> Mapping[str, float]:
+        """Get a read-only live view of all performance metrics"""
+        return self._performance_view
         
-    def get_performance_metrics(self) -> Dict[str, float]:
-        """Get all performance metrics"""
+    def get_performance_metrics_copy(self) -> Dict[str, float]:
+        """Get a mutable copy of all performance metrics"""
         return self.performance_metrics.copy()
         
     def get_context_summary(self) -> Dict[str, Any]:
         """Get a summary of current context"""
         return {
-            "mode": self.mode.value,
-            "emotional_state": self.emotional_state.value,
+            "mode": self._mode_str,
+            "emotional_state": self._emo_str,
             "current_task": self.current_task,
             "context_keys": list(self.context.keys()),
             "interaction_count": len(self.interaction_history),
-            "performance_metrics": self.performance_metrics,
+            "performance_metrics": self.performance_metrics.copy(),
             "last_updated": self.last_updated.isoformat()
         }
         
     def to_dict(self) -> Dict[str, Any]:
         """Convert state to dictionary for serialization"""
         return {
-            "mode": self.mode.value,
-            "emotional_state": self.emotional_state.value,
+            "mode": self._mode_str,
+            "emotional_state": self._emo_str,
             "context": self.context,
             "current_task": self.current_task,
-            "interaction_history": self.interaction_history,
+            "interaction_history": list(self.interaction_history),
             "performance_metrics": self.performance_metrics,
             "last_updated": self.last_updated.isoformat()
         }
         
+    def _raw_state(self) -> Dict[str, Any]:
+        """State as plain values, with last_updated left as a datetime"""
+        return {
+            "mode": self._mode_str,
+            "emotional_state": self._emo_str,
+            "context": self.context,
+            "current_task": self.current_task,
+            "interaction_history": list(self.interaction_history),
+            "performance_metrics": self.performance_metrics,
+            "last_updated": self.last_updated
+        }
+        
+    def dumps(self) -> bytes:
+        """Serialize state to JSON bytes"""
+        if ORJSON_AVAILABLE:
+            # orjson writes datetimes natively, in the same ISO format; keys
+            # that are not strings are written as strings, like json does
+            return orjson.dumps(
+                self._raw_state(), default=_json_default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+            )
+        return json.dumps(self.to_dict()).encode("utf-8")
+        
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "AgentState":
+        """Create a state from JSON bytes produced by dumps()"""
+        state = cls()
+        state.from_dict(orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw))
+        return state
+        
     def from_dict(self, data: Dict[str, Any]) -> None:
         """Load state from dictionary"""
-        self.mode = AgentMode(data.get("mode", "idle"))
-        self.emotional_state = EmotionalState(data.get("emotional_state", "neutral"))
+        self.mode = _MODE_MAP.get(data.get("mode", "idle"), AgentMode.IDLE)
+        self.emotional_state = _EMO_MAP.get(
+            data.get("emotional_state", "neutral"), EmotionalState.NEUTRAL
+        )
+        self._mode_str = self.mode.value
+        self._emo_str = self.emotional_state.value
         self.context = data.get("context", {})
         self.current_task = data.get("current_task")
-        self.interaction_history = data.get("interaction_history", [])
+        self.interaction_history = deque(
+            data.get("interaction_history", []), maxlen=MAX_INTERACTION_HISTORY
+        )
         self.performance_metrics = data.get("performance_metrics", {})
+        self._performance_view = MappingProxyType(self.performance_metrics)
         
         if "last_updated" in data:
             self.last_updated = datetime.fromisoformat(data["last_updated"])
         else:
-            self.last_updated = datetime.now()
+            self.last_updated = _now_coarse()
@@ -3,13 +3,47 @@ Entity extraction component for identifying and extracting entities from text
 """
 
 import re
+from collections import Counter, namedtuple
+from operator import attrgetter, itemgetter
 from typing import Dict, Any, List, Optional, Tuple
 from loguru import logger
 
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# Lightweight entity record used internally; extract_entities() returns dicts
+Entity = namedtuple("Entity", "type text start end confidence method")
+
+_STAT_FIELDS = itemgetter("type", "confidence", "extraction_method")
+_START = attrgetter("start")
+
+
+def _is_word_char(char: str) -> bool:
+    """Whether a character counts as part of a word, as regex \\w does"""
+    return char.isalnum() or char == "_"
+
 
 class EntityExtractor:
     """Entity extractor for identifying named entities in text"""
     
+    __slots__ = (
+        "patterns",
+        "common_entities",
+        "relation_patterns",
+        "_dictionary_terms",
+        "_dictionary_categories",
+        "_automaton",
+        "_dictionary_re",
+        "_compiled_patterns",
+        "_entity_re",
+        "_compiled_patterns_ascii",
+        "_entity_re_ascii",
+        "_compiled_relations",
+    )
+    
     def __init__(self):
         # Entity patterns
         self.patterns = {
@@ -33,7 +67,9 @@ class EntityExtractor:
                 r'\b(?:January|February|March|April|May|June|July|August|September|October|November|December) \d{1,2}, \d{4}\b'
             ],
             "email": [
-                r'\b[\w\.-]+@[\w\.-]+\.\w+\b'
+                # Anchored to the start of a [\w.-] run so a run without "@"
+                # is scanned once rather than from every word boundary in it
+                r'(?<![\w.-])[.-]*\b[\w.-]+@[\w.-]+\.\w+\b'
             ],
             "phone": [
                 r'\b\d{3}-\d{3}-\d{4}\b',
@@ -41,7 +77,8 @@ class EntityExtractor:
                 r'\b\d{3}\.\d{3}\.\d{4}\b'
             ],
             "url": [
-                r'https?://(?:[-\w.])+(?:[:\d]+)?(?:/(?:[\w/_.])*(?:\?(?:[\w&=%.])*)?(?:#(?:\w*))?)?'
+                # Host and port classes are disjoint, so there is nothing to backtrack into
+                r'https?://[-\w.]+(?::[:\d]*)?(?:/[\w/.]*(?:\?[\w&=%.]*)?(?:#\w*)?)?'
             ],
             "money": [
                 r'\$\d+(?:,\d{3})*(?:\.\d{2})?',
@@ -71,84 +108,182 @@ class EntityExtractor:
             ]
         }
         
+        # Flat (category, term) table for the dictionary scan
+        self._dictionary_terms: List[Tuple[str, str]] = [
+            (category, entity_name)
+            for category, entity_list in self.common_entities.items()
+            for entity_name in entity_list
+        ]
+        self._dictionary_categories: Dict[str, str] = {
+            entity_name: category for category, entity_name in self._dictionary_terms
+        }
+        
+        # Aho-Corasick automaton over the dictionary terms, so every occurrence
+        # of every term is found in one pass; hits inside longer words are
+        # filtered afterwards. Without it a single alternation is used, longest
+        # terms first, bounded by lookarounds since terms like "C++" end in a
+        # non-word character where \b would not match.
+        self._automaton = None
+        if AHOCORASICK_AVAILABLE:
+            self._automaton = ahocorasick.Automaton()
+            for category, entity_name in self._dictionary_terms:
+                self._automaton.add_word(entity_name, (category, entity_name))
+            self._automaton.make_automaton()
+        terms = sorted(self._dictionary_categories, key=len, reverse=True)
+        self._dictionary_re = re.compile(
+            r'(?<!\w)(?:' + '|'.join(map(re.escape, terms)) + r')(?!\w)'
+        )
+        
+        # Simple relation patterns
+        self.relation_patterns = [
+            (r'(\w+)\s+(?:is|was)\s+(?:a|an|the)?\s*(\w+)', "is_a"),
+            (r'(\w+)\s+(?:works for|employed by)\s+(\w+)', "works_for"),
+            (r'(\w+)\s+(?:located in|in)\s+(\w+)', "located_in"),
+            (r'(\w+)\s+(?:founded|created|established)\s+(\w+)', "founded"),
+            (r'(\w+)\s+(?:owns|owns the)\s+(\w+)', "owns")
+        ]
+        
+        # Compile patterns once rather than on every extraction call. They are
+        # also fused into one alternation so the text is scanned a single time;
+        # each pattern gets a named group that maps back to it.
+        self._compiled_patterns: List[Tuple[str, str, re.Pattern]] = []
+        parts = []
+        for entity_type, patterns in self.patterns.items():
+            for i, pattern in enumerate(patterns):
+                group_name = f"{re.sub(r'[^0-9a-zA-Z_]', '_', entity_type)}_{i}"
+                self._compiled_patterns.append((group_name, entity_type, re.compile(pattern)))
+                parts.append(f"(?P<{group_name}>{self._strip_named_groups(pattern)})")
+        self._entity_re = re.compile("|".join(parts))
+        
+        # The patterns are pure ASCII, so bytes versions give the same matches
+        # on ASCII text while skipping the regex engine's Unicode handling
+        self._compiled_patterns_ascii: List[Tuple[str, str, re.Pattern]] = [
+            (group_name, entity_type, re.compile(pattern.pattern.encode("ascii")))
+            for group_name, entity_type, pattern in self._compiled_patterns
+        ]
+        self._entity_re_ascii = re.compile(self._entity_re.pattern.encode("ascii"))
+        
+        self._compiled_relations = [
+            (re.compile(pattern, re.IGNORECASE), relation_type)
+            for pattern, relation_type in self.relation_patterns
+        ]
+        
     def extract_entities(self, text: str) -> List[Dict[str, Any]]:
         """Extract entities from text"""
         
-        entities = []
+        return [
+            {
+                "type": entity.type,
+                "text": entity.text,
+                "start": entity.start,
+                "end": entity.end,
+                "confidence": entity.confidence,
+                "extraction_method": entity.method
+            }
+            for entity in self.extract_entity_records(text)
+        ]
         
-        # Pattern-based extraction
-        for entity_type, patterns in self.patterns.items():
-            for pattern in patterns:
-                matches = re.finditer(pattern, text)
-                for match in matches:
-                    entity = {
-                        "type": entity_type,
-                        "text": match.group(),
-                        "start": match.start(),
-                        "end": match.end(),
-                        "confidence": 0.8,
-                        "extraction_method": "pattern"
-                    }
-                    entities.append(entity)
-                    
+    def extract_entity_records(self, text: str) -> List[Entity]:
+        """Extract entities from text as Entity records, sorted by position"""
+        
+        candidates = []
+        append = candidates.append
+        
+        # Pattern-based extraction: the fused pattern finds, in order, every
+        # position where some pattern matches. It only reports the first such
+        # pattern and would skip past its match, so the search resumes one
+        # character on, and each pattern is tried anchored at the position
+        # unless it is still inside its own previous match. That gives every
+        # pattern the same non-overlapping matches as scanning it on its own,
+        # including entities that start inside another pattern's match.
+        # ASCII text is scanned as bytes, where offsets equal str offsets.
+        if text.isascii():
+            subject = text.encode("ascii")
+            entity_re, compiled_patterns = self._entity_re_ascii, self._compiled_patterns_ascii
+        else:
+            subject = text
+            entity_re, compiled_patterns = self._entity_re, self._compiled_patterns
+            
+        resume_at = [0] * len(compiled_patterns)
+        match = entity_re.search(subject)
+        while match is not None:
+            start = match.start()
+            for k, (group_name, entity_type, pattern) in enumerate(compiled_patterns):
+                if resume_at[k] > start:
+                    continue
+                if group_name == match.lastgroup:
+                    end = match.end()
+                else:
+                    hit = pattern.match(subject, start)
+                    if hit is None:
+                        continue
+                    end = hit.end()
+                resume_at[k] = end if end > start else start + 1
+                append(Entity(entity_type, text[start:end], start, end, 0.8, "pattern"))
+            match = entity_re.search(subject, start + 1)
+                
         # Dictionary-based extraction
-        for category, entity_list in self.common_entities.items():
-            for entity_name in entity_list:
-                if entity_name in text:
-                    start = text.find(entity_name)
-                    entity = {
-                        "type": category,
-                        "text": entity_name,
-                        "start": start,
-                        "end": start + len(entity_name),
-                        "confidence": 0.9,
-                        "extraction_method": "dictionary"
-                    }
-                    entities.append(entity)
-                    
-        # Remove duplicates and sort by position
-        unique_entities = self._remove_duplicates(entities)
-        unique_entities.sort(key=lambda x: x["start"])
+        for category, entity_name, start in self._find_dictionary_terms(text):
+            append(Entity(category, entity_name, start, start + len(entity_name), 0.9, "dictionary"))
+            
+        # Remove duplicates, keeping the most confident entity per span
+        best: Dict[Tuple[int, int], Entity] = {}
+        for entity in candidates:
+            span = (entity.start, entity.end)
+            current = best.get(span)
+            if current is None or entity.confidence > current.confidence:
+                best[span] = entity
+                
+        return sorted(best.values(), key=_START)
         
-        return unique_entities
+    def _find_dictionary_terms(self, text: str) -> List[Tuple[str, str, int]]:
+        """Find every whole-word occurrence of every dictionary term as (category, term, start)"""
         
-    def _remove_duplicates(self, entities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Remove duplicate entities"""
+        if self._automaton is not None:
+            found = []
+            text_length = len(text)
+            for end, (category, entity_name) in self._automaton.iter(text):
+                start = end - len(entity_name) + 1
+                if start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if end + 1 < text_length and _is_word_char(text[end + 1]):
+                    continue
+                found.append((category, entity_name, start))
+            return found
+            
+        categories = self._dictionary_categories
+        return [
+            (categories[match.group()], match.group(), match.start())
+            for match in self._dictionary_re.finditer(text)
+        ]
         
-        unique_entities = []
-        seen_spans = set()
+    @staticmethod
+    def _strip_named_groups(pattern: str) -> str:
+        """Turn named groups into plain groups so patterns can be fused"""
         
-        for entity in entities:
-            span = (entity["start"], entity["end"])
-            if span not in seen_spans:
-                unique_entities.append(entity)
-                seen_spans.add(span)
-                
-        return unique_entities
+        return re.sub(r'\(\?P<\w+>', '(', pattern)
         
     def extract_relations(self, text: str, entities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Extract relations between entities"""
         
         relations = []
         
-        # Simple relation patterns
-        relation_patterns = [
-            (r'(\w+)\s+(?:is|was)\s+(?:a|an|the)?\s*(\w+)', "is_a"),
-            (r'(\w+)\s+(?:works for|employed by)\s+(\w+)', "works_for"),
-            (r'(\w+)\s+(?:located in|in)\s+(\w+)', "located_in"),
-            (r'(\w+)\s+(?:founded|created|established)\s+(\w+)', "founded"),
-            (r'(\w+)\s+(?:owns|owns the)\s+(\w+)', "owns")
-        ]
-        
-        for pattern, relation_type in relation_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
+        # Index entities by lowercased text once for all lookups below
+        exact: Dict[str, Dict[str, Any]] = {}
+        lowered = []
+        for entity in entities:
+            entity_text = entity["text"].lower()
+            exact.setdefault(entity_text, entity)
+            lowered.append((entity_text, entity))
+            
+        for pattern, relation_type in self._compiled_relations:
+            for match in pattern.finditer(text):
                 source_text = match.group(1)
                 target_text = match.group(2)
                 
                 # Find corresponding entities
-                source_entity = self._find_entity_by_text(source_text, entities)
-                target_entity = self._find_entity_by_text(target_text, entities)
+                source_entity = self._find_entity_by_text(source_text, exact, lowered)
+                target_entity = self._find_entity_by_text(target_text, exact, lowered)
                 
                 if source_entity and target_entity:
                     relation = {
@@ -162,16 +297,18 @@ class EntityExtractor:
                     
         return relations
         
-    def _find_entity_by_text(self, text: str, entities: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
-        """Find entity by text content"""
+    def _find_entity_by_text(self, text: str, exact: Dict[str, Dict[str, Any]],
+                             lowered: List[Tuple[str, Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """Find entity by text content, using the index built by extract_relations"""
         
-        for entity in entities:
-            if entity["text"].lower() == text.lower():
-                return entity
-                
+        text = text.lower()
+        hit = exact.get(text)
+        if hit is not None:
+            return hit
+            
         # Partial match
-        for entity in entities:
-            if text.lower() in entity["text"].lower() or entity["text"].lower() in text.lower():
+        for entity_text, entity in lowered:
+            if text in entity_text or entity_text in text:
                 return entity
                 
         return None
@@ -182,22 +319,12 @@ class EntityExtractor:
         if not entities:
             return {"total_entities": 0}
             
-        # Count by type
-        type_counts = {}
-        for entity in entities:
-            entity_type = entity["type"]
-            type_counts[entity_type] = type_counts.get(entity_type, 0) + 1
-            
-        # Average confidence
-        confidences = [e["confidence"] for e in entities]
-        avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+        # Pull the needed fields out column-wise in one pass
+        types, confidences, methods = zip(*map(_STAT_FIELDS, entities))
         
         return {
             "total_entities": len(entities),
-            "type_distribution": type_counts,
-            "average_confidence": avg_confidence,
-            "extraction_methods": {
-                method: len([e for e in entities if e["extraction_method"] == method])
-                for method in set(e["extraction_method"] for e in entities)
-            }
+            "type_distribution": dict(Counter(types)),
+            "average_confidence": sum(confidences) / len(confidences),
+            "extraction_methods": dict(Counter(methods))
         }
@@ -3,20 +3,370 @@ Knowledge graph for storing and querying structured knowledge
 """
 
 import os
+import re
+import sys
 import json
+import time
+import heapq
+import queue
+import atexit
 import pickle
-from typing import Dict, Any, List, Optional, Set, Tuple
+import shutil
+import threading
+import hashlib
+import itertools
+from typing import Dict, Any, Callable, Iterator, List, Optional, Set, Tuple
+from collections import Counter, deque
+from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from operator import attrgetter
 import networkx as nx
-import numpy as np
 from loguru import logger
 
 from ..core.config import KnowledgeConfig
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import zstandard as zstd
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# msgpack extension type carrying a datetime as its ISO string
+_DATETIME_EXT = 1
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _dumps(obj: Any) -> bytes:
+    """Serialize an object to JSON bytes, writing unknown types with str()"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(
+            obj, default=str,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+    return json.dumps(obj, indent=2, default=str).encode("utf-8")
+
+
+def _loads(raw: bytes) -> Any:
+    """Parse JSON bytes"""
+    return orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
+
+
+def _msgpack_default(obj: Any) -> Any:
+    """Encode types msgpack does not know: datetimes natively, others with str()"""
+    if isinstance(obj, datetime):
+        return msgpack.ExtType(_DATETIME_EXT, obj.isoformat().encode("ascii"))
+    return str(obj)
+
+
+def _msgpack_ext_hook(code: int, data: bytes) -> Any:
+    """Decode extension types written by _msgpack_default"""
+    if code == _DATETIME_EXT:
+        return datetime.fromisoformat(data.decode("ascii"))
+    return msgpack.ExtType(code, data)
+
+
+def _pack(obj: Any) -> bytes:
+    """Serialize an object for cold storage, as msgpack if available, else JSON"""
+    if MSGPACK_AVAILABLE:
+        return msgpack.packb(obj, default=_msgpack_default, use_bin_type=True)
+    return _dumps(obj)
+
+
+def _unpack(path: str) -> Any:
+    """Read a file written by _pack, picking the format from its extension"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if path.endswith(".zst"):
+        raw = zstd.ZstdDecompressor().decompress(raw)
+        path = path[:-len(".zst")]
+    if path.endswith(".msgpack"):
+        return msgpack.unpackb(raw, ext_hook=_msgpack_ext_hook, raw=False, strict_map_key=False)
+    return _loads(raw)
+
+
+def _data_file(memory_path: str, name: str, for_load: bool = False) -> str:
+    """Path of a data file: msgpack when available, else JSON, zstd-compressed when available
+    
+    Loading takes the first of the readable formats that exists, falling back to JSON.
+    """
+    extensions = []
+    if MSGPACK_AVAILABLE:
+        if ZSTD_AVAILABLE:
+            extensions.append(".msgpack.zst")
+        extensions.append(".msgpack")
+    if ZSTD_AVAILABLE:
+        extensions.append(".json.zst")
+    extensions.append(".json")
+    
+    paths = [os.path.join(memory_path, name + extension) for extension in extensions]
+    if for_load:
+        return next((path for path in paths if os.path.exists(path)), paths[-1])
+    return paths[0]
+
+
+def _pack_record(obj: Any) -> bytes:
+    """Serialize one op-log record: a msgpack object, or a line of JSON"""
+    if MSGPACK_AVAILABLE:
+        return msgpack.packb(obj, default=_msgpack_default, use_bin_type=True)
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(
+            obj, default=str,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE
+        )
+    return json.dumps(obj, default=str).encode("utf-8") + b"\n"
+
+
+def _read_records(path: str) -> Iterator[Any]:
+    """Read the records written by _pack_record, stopping at a torn trailing record"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if path.endswith(".log"):
+        unpacker = msgpack.Unpacker(raw=False, ext_hook=_msgpack_ext_hook, strict_map_key=False)
+        unpacker.feed(raw)
+        yield from unpacker
+        return
+    for line in raw.splitlines():
+        if not line.strip():
+            continue
+        try:
+            yield _loads(line)
+        except ValueError:
+            logger.warning(f"Ignoring truncated record in {path}")
+            return
+
+
+def _ops_log_file(memory_path: str, previous: bool = False, as_msgpack: Optional[bool] = None) -> str:
+    """Path of the op-log: msgpack records in ops.log, JSON lines in ops.jsonl otherwise
+    
+    The previous log holds the changes a snapshot in progress is writing out.
+    The format is msgpack when available unless as_msgpack says otherwise.
+    """
+    if as_msgpack is None:
+        as_msgpack = MSGPACK_AVAILABLE
+    name = "ops.prev" if previous else "ops"
+    return os.path.join(memory_path, f"{name}.log" if as_msgpack else f"{name}.jsonl")
+
+
+def _as_datetime(value: Any) -> Any:
+    """Parse an ISO timestamp read back from JSON; datetimes pass through"""
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _intern(value: Any) -> Any:
+    """Intern a string so repeats share one object; other values pass through"""
+    return sys.intern(value) if type(value) is str else value
+
+
+def _hash_id(data: bytes) -> str:
+    """16-character hex digest used for generated ids"""
+    if XXHASH_AVAILABLE:
+        return xxhash.xxh3_64_hexdigest(data)
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def _write_file(path: str, payload: bytes) -> None:
+    """Write a file in one buffered write via a synced temp file, then swap it in
+    
+    Payloads for *.zst paths are zstd-compressed first.
+    """
+    if path.endswith(".zst"):
+        payload = zstd.ZstdCompressor(level=3).compress(payload)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb', buffering=1 << 20) as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _reverse_relation(relation: Dict[str, Any]) -> Dict[str, Any]:
+    """Edge data for the reverse edge of a bidirectional relation"""
+    reverse_relation = relation.copy()
+    reverse_relation["source"] = relation["target"]
+    reverse_relation["target"] = relation["source"]
+    reverse_relation["id"] = f"reverse_{relation['id']}"
+    return reverse_relation
+
+
+def _build_graph(entities: Dict[str, Any], relations: Dict[str, Dict[str, Any]]) -> nx.MultiDiGraph:
+    """Build the graph of entity nodes and relation edges"""
+    graph = nx.MultiDiGraph()
+    
+    # Nodes only carry the id and edges are (source, target, key, data), added
+    # in bulk; each bidirectional relation also gets its reverse edge
+    graph.add_nodes_from(entities)
+    graph.add_edges_from(
+        (edge["source"], edge["target"], edge["id"], edge)
+        for relation in relations.values()
+        for edge in (
+            (relation, _reverse_relation(relation)) if relation.get("bidirectional") else (relation,)
+        )
+    )
+    
+    return graph
+
+
+def _index_data(entities: Dict[str, Any]) -> Dict[str, Any]:
+    """Type and attribute indexes of a set of entities, in serializable form"""
+    type_index: Dict[str, List[str]] = {}
+    attribute_index: Dict[str, Dict[Any, List[str]]] = {}
+    for entity_id, entity in entities.items():
+        type_index.setdefault(entity.type, []).append(entity_id)
+        for attr_name, attr_value in entity.attributes.items():
+            attribute_index.setdefault(attr_name, {}).setdefault(attr_value, []).append(entity_id)
+    return {"type_index": type_index, "attribute_index": attribute_index}
+
+
+def _serialize_and_write(path: str, serialize: Callable[[], bytes]) -> None:
+    """Serialize a payload and write it to a file"""
+    _write_file(path, serialize())
+
+
+def _write_files(outputs: List[Tuple[str, Callable[[], bytes]]]) -> None:
+    """Serialize and write independent files concurrently"""
+    try:
+        with ThreadPoolExecutor(max_workers=len(outputs)) as pool:
+            futures = [pool.submit(_serialize_and_write, path, serialize) for path, serialize in outputs]
+    except RuntimeError:
+        # No new threads can be started during interpreter shutdown (atexit flush)
+        for path, serialize in outputs:
+            _serialize_and_write(path, serialize)
+        return
+    for future in futures:
+        future.result()
+
+
+class Entity(MutableMapping):
+    """Entity record with fixed slotted fields and dict-style access
+    
+    Entities are stored in this form to avoid a per-entity dict; copy()
+    returns a plain dict for callers and serialization. Accesses only record
+    a nanosecond timestamp; last_accessed builds the datetime when read.
+    """
+    
+    FIELDS = (
+        "id",
+        "name",
+        "type",
+        "attributes",
+        "description",
+        "importance",
+        "created_at",
+        "last_accessed",
+        "access_count",
+        "confidence",
+    )
+    
+    __slots__ = tuple(name for name in FIELDS if name != "last_accessed") + (
+        "_last_accessed",
+        "_access_ns",
+    )
+    
+    def __init__(self, id: str, name: str = "", type: str = "unknown",
+                 attributes: Optional[Dict[str, Any]] = None, description: str = "",
+                 importance: float = 0.5, created_at: Any = None, last_accessed: Any = None,
+                 access_count: int = 0, confidence: float = 1.0):
+        self.id = id
+        self.name = name
+        self.type = type
+        self.attributes = attributes if attributes is not None else {}
+        self.description = description
+        self.importance = importance
+        self.created_at = created_at
+        self.last_accessed = last_accessed
+        self.access_count = access_count
+        self.confidence = confidence
+        
+    @property
+    def last_accessed(self) -> Any:
+        """When the entity was last accessed, as a datetime"""
+        # Read once: the saver thread reads this while touch() may write it
+        access_ns = self._access_ns
+        if access_ns is not None:
+            self._last_accessed = datetime.fromtimestamp(access_ns / 1e9)
+            self._access_ns = None
+        return self._last_accessed
+        
+    @last_accessed.setter
+    def last_accessed(self, value: Any) -> None:
+        self._last_accessed = value
+        self._access_ns = None
+        
+    def touch(self) -> None:
+        """Record an access without building a datetime"""
+        self._access_ns = time.time_ns()
+        self.access_count += 1
+        
+    @classmethod
+    def from_mapping(cls, data: Dict[str, Any]) -> "Entity":
+        """Create an entity from a dict, ignoring unknown keys"""
+        return cls(**{name: data[name] for name in _ENTITY_FIELDS if name in data})
+        
+    def __getitem__(self, key: str) -> Any:
+        if key not in _ENTITY_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+        
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key not in _ENTITY_FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+        
+    def __delitem__(self, key: str) -> None:
+        raise TypeError("Entity fields cannot be deleted")
+        
+    def __iter__(self):
+        return iter(self.FIELDS)
+        
+    def __len__(self) -> int:
+        return len(self.FIELDS)
+        
+    def intern_strings(self) -> "Entity":
+        """Intern the type and attribute names and values, which repeat across entities"""
+        self.type = _intern(self.type)
+        self.attributes = {_intern(k): _intern(v) for k, v in self.attributes.items()}
+        return self
+        
+    def copy(self) -> Dict[str, Any]:
+        """Return the entity as a plain dict"""
+        return dict(zip(self.FIELDS, _entity_values(self)))
+
+
+_ENTITY_FIELDS = frozenset(Entity.FIELDS)
+_entity_values = attrgetter(*Entity.FIELDS)
+
 
 class KnowledgeGraph:
     """Knowledge graph for storing entities and their relationships"""
     
+    # Query relevance contributed by a match in each entity field
+    FIELD_WEIGHTS = {
+        "name": 1.0,
+        "description": 0.8,
+        "attributes": 0.5,
+        "type": 0.3
+    }
+    
     def __init__(self, config: KnowledgeConfig, memory_path: str = "./memory"):
         self.config = config
         self.memory_path = memory_path
@@ -24,19 +374,79 @@ class KnowledgeGraph:
         
         # Graph structure
         self.graph = nx.MultiDiGraph()
-        self.entities: Dict[str, Dict[str, Any]] = {}
+        self.entities: Dict[str, Entity] = {}
         self.relations: Dict[str, Dict[str, Any]] = {}
         
         # Indexes for efficient querying
         self.type_index: Dict[str, Set[str]] = {}
         self.attribute_index: Dict[str, Dict[str, Set[str]]] = {}
         
+        # Inverted index for query(): token -> {entity_id: field weight}
+        self.token_index: Dict[str, Dict[str, float]] = {}
+        # Lowercased tokens of each entity, kept so removal needs no re-tokenizing
+        self._entity_tokens: Dict[str, Tuple[str, ...]] = {}
+        # Relation type -> relation ids, and each type's lowercased form
+        self.relation_type_index: Dict[str, Set[str]] = {}
+        self._relation_types_lc: Dict[str, str] = {}
+        
         # Statistics
         self.creation_time = datetime.now()
         self.last_updated = datetime.now()
-        
-        # Load existing knowledge graph
+        # Read-only adjacency snapshot for traversal, rebuilt lazily after the
+        # relations change: node -> ((neighbor, relation types), ...)
+        self._adjacency: Optional[Dict[str, Tuple[Tuple[str, frozenset], ...]]] = None
+        
+        # Lazy min-heaps of (eviction score, id); entries whose score no longer
+        # matches the stored item are skipped when popped
+        self._entity_heap: List[Tuple[float, str]] = []
+        self._relation_heap: List[Tuple[float, str]] = []
+        
+        # Running importance totals so averages need no pass over the graph
+        self._entity_importance_sum = 0.0
+        self._relation_importance_sum = 0.0
+        
+        # Generated ids hash a per-instance random seed and a counter, so they
+        # are short, fixed length and do not collide across sessions
+        self._id_seed = os.urandom(8)
+        self._id_counter = itertools.count()
+        
+        # Each change is appended to an op-log; the full graph is only
+        # snapshotted (and the log truncated) once enough changes or time
+        # have accumulated
+        self._log_file = _ops_log_file(memory_path)
+        self._previous_log_file = _ops_log_file(memory_path, previous=True)
+        # JSON logs written before msgpack was installed: replayed first, and
+        # removed once a snapshot holds their changes
+        self._legacy_log_files: List[str] = []
+        self._log_fh = None
+        self._log_lock = threading.Lock()
+        # Held across each change, its version bump and its log record, and
+        # while a snapshot rotates the log and copies the state, so a change
+        # lands either in the snapshot or in the new log, never both
+        self._change_lock = threading.RLock()
+        self._replaying = False
+        self._dirty = False
+        self._pending_changes = 0
+        self._last_flush = time.monotonic()
+        
+        # Incremented once per logged change and saved with snapshots, so it
+        # identifies the graph's contents across restarts
+        self.version = 0
+        
+        # Load existing knowledge graph, then the changes logged since
         self._load_knowledge_graph()
+        self._replay_op_log()
+        
+        # Snapshots are written by a background thread; a pending request
+        # already covers any later changes, so requests coalesce
+        self._save_lock = threading.RLock()
+        self._save_queue: queue.Queue = queue.Queue(maxsize=1)
+        self._saver_thread = threading.Thread(
+            target=self._save_loop, name="kg-saver", daemon=True
+        )
+        self._saver_thread.start()
+        
+        atexit.register(self.flush)
         
         logger.info("Knowledge graph initialized")
         
@@ -47,25 +457,51 @@ class KnowledgeGraph:
     def _load_knowledge_graph(self):
         """Load existing knowledge graph from disk"""
         graph_file = os.path.join(self.memory_path, "knowledge_graph.pkl")
-        entities_file = os.path.join(self.memory_path, "entities.json")
-        indexes_file = os.path.join(self.memory_path, "kg_indexes.json")
+        entities_file = _data_file(self.memory_path, "entities", for_load=True)
+        indexes_file = _data_file(self.memory_path, "kg_indexes", for_load=True)
         
         if os.path.exists(graph_file):
             try:
+                # Each file is read in one call and parsed from memory
                 with open(graph_file, 'rb') as f:
-                    self.graph = pickle.load(f)
+                    self.graph = pickle.loads(f.read())
+                self._adjacency = None
                     
-                with open(entities_file, 'r') as f:
-                    self.entities = json.load(f)
+                # Timestamps come back as strings from a JSON snapshot
+                self.entities = {}
+                for entity_id, entity_data in _unpack(entities_file).items():
+                    entity = Entity.from_mapping(entity_data).intern_strings()
+                    entity.created_at = _as_datetime(entity.created_at)
+                    entity.last_accessed = _as_datetime(entity.last_accessed)
+                    self.entities[entity_id] = entity
                     
-                with open(indexes_file, 'r') as f:
-                    indexes_data = json.load(f)
-                    self.type_index = {k: set(v) for k, v in indexes_data.get("type_index", {}).items()}
-                    self.attribute_index = {
-                        k: {attr: set(vals) for attr, vals in v.items()}
-                        for k, v in indexes_data.get("attribute_index", {}).items()
-                    }
+                # Relations live on the graph edges; reverse edges are derived
+                self.relations = {
+                    key: dict(data)
+                    for _, _, key, data in self.graph.edges(keys=True, data=True)
+                    if not key.startswith("reverse_")
+                }
+                self.relation_type_index = {}
+                self._relation_types_lc = {}
+                for relation_id, relation in self.relations.items():
+                    relation["type"] = _intern(relation["type"])
+                    relation["created_at"] = _as_datetime(relation["created_at"])
+                    self._index_relation_type(relation_id, relation["type"])
+                
+                indexes_data = _unpack(indexes_file)
+                self.version = indexes_data.get("version", 0)
+                self.type_index = {
+                    _intern(k): set(v) for k, v in indexes_data.get("type_index", {}).items()
+                }
+                self.attribute_index = {
+                    _intern(k): {_intern(attr): set(vals) for attr, vals in v.items()}
+                    for k, v in indexes_data.get("attribute_index", {}).items()
+                }
                     
+                self._rebuild_token_index()
+                self._recompute_importance_sums()
+                self._rebuild_eviction_heaps()
+                
                 logger.info("Knowledge graph loaded from disk")
                 
             except Exception as e:
@@ -74,102 +510,300 @@ class KnowledgeGraph:
     def _save_knowledge_graph(self):
         """Save knowledge graph to disk"""
         graph_file = os.path.join(self.memory_path, "knowledge_graph.pkl")
-        entities_file = os.path.join(self.memory_path, "entities.json")
-        indexes_file = os.path.join(self.memory_path, "kg_indexes.json")
+        entities_file = _data_file(self.memory_path, "entities")
+        indexes_file = _data_file(self.memory_path, "kg_indexes")
         
-        try:
-            with open(graph_file, 'wb') as f:
-                pickle.dump(self.graph, f)
-                
-            with open(entities_file, 'w') as f:
-                json.dump(self.entities, f, indent=2, default=str)
-                
-            with open(indexes_file, 'w') as f:
-                indexes_data = {
-                    "type_index": {k: list(v) for k, v in self.type_index.items()},
-                    "attribute_index": {
-                        k: {attr: list(vals) for attr, vals in v.items()}
-                        for k, v in self.attribute_index.items()
-                    }
-                }
-                json.dump(indexes_data, f, indent=2)
+        with self._save_lock:
+            try:
+                # Start a fresh op-log before copying the state: changes logged
+                # up to here are in the copies, later ones go to the new log
+                with self._change_lock:
+                    self._rotate_op_log()
+                    version = self.version
+                    entities = self.entities.copy()
+                    relations = self.relations.copy()
+                    self._dirty = False
+                    self._pending_changes = 0
+                    self._last_flush = time.monotonic()
+                
+                # The three files are independent, so serialize and write them
+                # concurrently; the writes and fsyncs overlap outside the GIL
+                outputs = [
+                    (graph_file, lambda: pickle.dumps(
+                        _build_graph(entities, relations), protocol=pickle.HIGHEST_PROTOCOL
+                    )),
+                    (entities_file, lambda: _pack(
+                        {entity_id: entity.copy() for entity_id, entity in entities.items()}
+                    )),
+                    (indexes_file, lambda: _pack(dict(_index_data(entities), version=version)))
+                ]
+                _write_files(outputs)
+                
+                # Everything in the previous (and any legacy) log is now in the snapshot
+                os.remove(self._previous_log_file)
+                for legacy_log_file in self._legacy_log_files:
+                    os.remove(legacy_log_file)
+                self._legacy_log_files = []
+                
+                logger.debug("Knowledge graph saved to disk")
+                
+            except Exception as e:
+                self._dirty = True
+                logger.warning(f"Failed to save knowledge graph: {e}")
+                
+    def _rotate_op_log(self) -> None:
+        """Move the op-log aside as the previous log and start an empty one"""
+        
+        with self._log_lock:
+            if self._log_fh is not None:
+                self._log_fh.close()
+                self._log_fh = None
+                
+            if not os.path.exists(self._log_file):
+                open(self._log_file, 'ab').close()
                 
-            logger.debug("Knowledge graph saved to disk")
+            if os.path.exists(self._previous_log_file):
+                # An earlier snapshot failed; keep its changes ahead of the new ones
+                with open(self._previous_log_file, 'ab') as dst, open(self._log_file, 'rb') as src:
+                    shutil.copyfileobj(src, dst)
+                os.remove(self._log_file)
+            else:
+                os.replace(self._log_file, self._previous_log_file)
+                
+    def _save_loop(self) -> None:
+        """Write a snapshot whenever one is requested"""
+        
+        while True:
+            self._save_queue.get()
+            self._save_knowledge_graph()
+            
+    def _request_save(self) -> None:
+        """Ask the background thread for a snapshot without waiting for it"""
+        
+        try:
+            self._save_queue.put_nowait(None)
+        except queue.Full:
+            pass
+            
+    def _replay_op_log(self) -> None:
+        """Apply the changes logged since the last snapshot"""
+        
+        # Logs in the other format predate this one's; only JSON ones can be
+        # read whether or not msgpack is installed
+        other_format_logs = [
+            path for path in (
+                _ops_log_file(self.memory_path, previous=True, as_msgpack=not MSGPACK_AVAILABLE),
+                _ops_log_file(self.memory_path, as_msgpack=not MSGPACK_AVAILABLE)
+            )
+            if os.path.exists(path)
+        ]
+        if MSGPACK_AVAILABLE:
+            self._legacy_log_files = other_format_logs
+        elif other_format_logs:
+            logger.warning("Knowledge graph op-log needs msgpack to be read; its changes are not replayed")
+            
+        log_files = self._legacy_log_files + [
+            path for path in (self._previous_log_file, self._log_file)
+            if os.path.exists(path)
+        ]
+        if not log_files:
+            return
             
+        applied = 0
+        self._replaying = True
+        try:
+            for log_file in log_files:
+                for record in _read_records(log_file):
+                    self._apply_op(record)
+                    applied += 1
         except Exception as e:
-            logger.warning(f"Failed to save knowledge graph: {e}")
+            logger.warning(f"Failed to replay knowledge graph op-log: {e}")
+        finally:
+            self._replaying = False
             
+        self.version += applied
+        if applied:
+            # Fold the replayed changes into the next snapshot
+            self._dirty = True
+            self._pending_changes = applied
+            logger.info(f"Replayed {applied} knowledge graph changes")
+            
+    def _apply_op(self, record: Dict[str, Any]) -> None:
+        """Apply one op-log record"""
+        
+        op = record.get("op")
+        if op == "add_entity":
+            entity = Entity.from_mapping(record["e"])
+            entity.created_at = _as_datetime(entity.created_at)
+            entity.last_accessed = _as_datetime(entity.last_accessed)
+            self._store_entity(entity)
+        elif op == "add_rel":
+            relation = dict(record["r"])
+            relation["created_at"] = _as_datetime(relation["created_at"])
+            self._store_relation(relation)
+        elif op == "del_entity":
+            self.remove_entity(record["id"])
+        elif op == "del_rel":
+            self.remove_relation(record["id"])
+        else:
+            logger.warning(f"Unknown knowledge graph op: {op}")
+            
+    def _append_op(self, record: Dict[str, Any]) -> None:
+        """Append one change record to the op-log"""
+        
+        try:
+            payload = _pack_record(record)
+            with self._log_lock:
+                if self._log_fh is None:
+                    self._log_fh = open(self._log_file, 'ab')
+                self._log_fh.write(payload)
+                self._log_fh.flush()
+        except Exception as e:
+            logger.warning(f"Failed to log knowledge graph change: {e}")
+            
+    def _mark_dirty(self, record: Dict[str, Any]) -> None:
+        """Log a change and snapshot once enough changes or time have accumulated"""
+        
+        if self._replaying:
+            return
+            
+        # Counted before logging, so a snapshot never holds a logged change
+        # without its version
+        self.version += 1
+        self._append_op(record)
+        self._dirty = True
+        self._pending_changes += 1
+        
+        if (self._pending_changes >= self.config.flush_batch_size or
+            time.monotonic() - self._last_flush >= self.config.flush_interval):
+            self._request_save()
+            
+    def flush(self) -> None:
+        """Snapshot pending changes to disk, after any snapshot in progress"""
+        
+        with self._save_lock:
+            if self._dirty:
+                self._save_knowledge_graph()
+            
+    def save_state(self) -> None:
+        """Save the knowledge graph to disk"""
+        
+        self.flush()
+        
+    def _next_id(self) -> str:
+        """Generate a new short id for an entity or relation"""
+        
+        return _hash_id(self._id_seed + next(self._id_counter).to_bytes(8, "little"))
+        
     def add_entity(self, entity_data: Dict[str, Any]) -> str:
         """Add a new entity to the knowledge graph"""
         
-        # Check capacity
-        if len(self.entities) >= self.config.max_entities:
-            self._remove_least_important_entity()
-            
-        # Generate entity ID if not provided
-        entity_id = entity_data.get("id") or f"entity_{datetime.now().timestamp()}"
-        
-        # Create entity
-        entity = {
-            "id": entity_id,
-            "name": entity_data.get("name", ""),
-            "type": entity_data.get("type", "unknown"),
-            "attributes": entity_data.get("attributes", {}),
-            "description": entity_data.get("description", ""),
-            "importance": entity_data.get("importance", 0.5),
-            "created_at": datetime.now(),
-            "last_accessed": datetime.now(),
-            "access_count": 0,
-            "confidence": entity_data.get("confidence", 1.0)
-        }
+        with self._change_lock:
+            # Check capacity
+            if len(self.entities) >= self.config.max_entities:
+                self._remove_least_important_entity()
+                
+            # Generate entity ID if not provided
+            entity_id = entity_data.get("id") or f"entity_{self._next_id()}"
+            
+            # Create entity
+            now = datetime.now()
+            entity = Entity(
+                id=entity_id,
+                name=entity_data.get("name", ""),
+                type=entity_data.get("type", "unknown"),
+                attributes=entity_data.get("attributes", {}),
+                description=entity_data.get("description", ""),
+                importance=entity_data.get("importance", 0.5),
+                created_at=now,
+                last_accessed=now,
+                access_count=0,
+                confidence=entity_data.get("confidence", 1.0)
+            )
+            
+            self._store_entity(entity)
+            
+            self.last_updated = datetime.now()
+            self._mark_dirty({"op": "add_entity", "e": entity.copy()})
+        
+        logger.info(f"Added entity: {entity_id}")
+        return entity_id
+        
+    def _store_entity(self, entity: Entity) -> None:
+        """Add an entity to storage, the graph and the indexes"""
+        
+        entity_id = entity.id
+        entity.intern_strings()
         
         # Add to storage
+        previous = self.entities.get(entity_id)
+        if previous is not None:
+            self._entity_importance_sum -= previous.importance
         self.entities[entity_id] = entity
+        self._entity_importance_sum += entity.importance
+        self._push_entity_score(entity_id, entity)
         
-        # Add to graph
-        self.graph.add_node(entity_id, **entity)
+        # Add to graph; the node only carries the id, self.entities holds the data
+        self.graph.add_node(entity_id)
         
         # Update indexes
         self._update_entity_indexes(entity_id, entity)
         
-        self.last_updated = datetime.now()
-        self._save_knowledge_graph()
-        
-        logger.info(f"Added entity: {entity_id}")
-        return entity_id
-        
     def add_relation(self, relation_data: Dict[str, Any]) -> str:
         """Add a new relation between entities"""
         
-        # Check capacity
-        if len(self.relations) >= self.config.max_relations:
-            self._remove_least_important_relation()
-            
-        # Validate entities exist
-        source_id = relation_data.get("source")
-        target_id = relation_data.get("target")
-        
-        if source_id not in self.entities or target_id not in self.entities:
-            raise ValueError("Source or target entity does not exist")
-            
-        # Generate relation ID
-        relation_id = f"rel_{datetime.now().timestamp()}"
-        
-        # Create relation
-        relation = {
-            "id": relation_id,
-            "source": source_id,
-            "target": target_id,
-            "type": relation_data.get("type", "related_to"),
-            "attributes": relation_data.get("attributes", {}),
-            "importance": relation_data.get("importance", 0.5),
-            "confidence": relation_data.get("confidence", 1.0),
-            "created_at": datetime.now(),
-            "bidirectional": relation_data.get("bidirectional", False)
-        }
+        with self._change_lock:
+            # Check capacity
+            if len(self.relations) >= self.config.max_relations:
+                self._remove_least_important_relation()
+                
+            # Validate entities exist
+            source_id = relation_data.get("source")
+            target_id = relation_data.get("target")
+            
+            if source_id not in self.entities or target_id not in self.entities:
+                raise ValueError("Source or target entity does not exist")
+                
+            # Generate relation ID
+            relation_id = f"rel_{self._next_id()}"
+            
+            # Create relation
+            relation = {
+                "id": relation_id,
+                "source": source_id,
+                "target": target_id,
+                "type": relation_data.get("type", "related_to"),
+                "attributes": relation_data.get("attributes", {}),
+                "importance": relation_data.get("importance", 0.5),
+                "confidence": relation_data.get("confidence", 1.0),
+                "created_at": datetime.now(),
+                "bidirectional": relation_data.get("bidirectional", False)
+            }
+            
+            self._store_relation(relation)
+            
+            self.last_updated = datetime.now()
+            self._mark_dirty({"op": "add_rel", "r": relation})
+        
+        logger.info(f"Added relation: {relation_id}")
+        return relation_id
+        
+    def _store_relation(self, relation: Dict[str, Any]) -> None:
+        """Add a relation to storage, the graph and the indexes"""
+        
+        relation_id = relation["id"]
+        source_id = relation["source"]
+        target_id = relation["target"]
+        relation["type"] = _intern(relation["type"])
         
         # Add to storage
+        previous = self.relations.get(relation_id)
+        if previous is not None:
+            self._relation_importance_sum -= previous["importance"]
         self.relations[relation_id] = relation
+        self._relation_importance_sum += relation["importance"]
+        heapq.heappush(self._relation_heap, (relation["importance"], relation_id))
+        self._index_relation_type(relation_id, relation["type"])
         
         # Add to graph
         self.graph.add_edge(
@@ -180,10 +814,7 @@ class KnowledgeGraph:
         
         # Add reverse edge if bidirectional
         if relation["bidirectional"]:
-            reverse_relation = relation.copy()
-            reverse_relation["source"] = target_id
-            reverse_relation["target"] = source_id
-            reverse_relation["id"] = f"reverse_{relation_id}"
+            reverse_relation = _reverse_relation(relation)
             
             self.graph.add_edge(
                 target_id, source_id,
@@ -191,63 +822,144 @@ class KnowledgeGraph:
                 **reverse_relation
             )
             
-        self.last_updated = datetime.now()
-        self._save_knowledge_graph()
+        self._adjacency = None
         
-        logger.info(f"Added relation: {relation_id}")
-        return relation_id
-        
-    def _update_entity_indexes(self, entity_id: str, entity: Dict[str, Any]) -> None:
+    def _update_entity_indexes(self, entity_id: str, entity: Entity) -> None:
         """Update indexes for efficient entity querying"""
         
         # Type index
-        entity_type = entity["type"]
+        entity_type = entity.type
         if entity_type not in self.type_index:
             self.type_index[entity_type] = set()
         self.type_index[entity_type].add(entity_id)
         
         # Attribute index
-        for attr_name, attr_value in entity["attributes"].items():
+        for attr_name, attr_value in entity.attributes.items():
             if attr_name not in self.attribute_index:
                 self.attribute_index[attr_name] = {}
             if attr_value not in self.attribute_index[attr_name]:
                 self.attribute_index[attr_name][attr_value] = set()
             self.attribute_index[attr_name][attr_value].add(entity_id)
             
-    def _remove_least_important_entity(self) -> None:
-        """Remove the least important entity to make space"""
-        
-        if not self.entities:
-            return
-            
-        least_important_id = min(
-            self.entities.keys(),
-            key=lambda eid: self.entities[eid]["importance"] * 
-                          (1 + self.entities[eid]["access_count"] * 0.1)
+        # Token index
+        self._index_entity_tokens(entity_id, entity)
+        
+    def _index_entity_tokens(self, entity_id: str, entity: Entity) -> None:
+        """Add an entity's tokens to the token index"""
+        
+        weights = self._entity_token_weights(entity)
+        for token, weight in weights.items():
+            self.token_index.setdefault(token, {})[entity_id] = weight
+        self._entity_tokens[entity_id] = tuple(weights)
+        
+    def _index_relation_type(self, relation_id: str, relation_type: str) -> None:
+        """Add a relation to the relation type index"""
+        
+        if relation_type not in self.relation_type_index:
+            self.relation_type_index[relation_type] = set()
+            self._relation_types_lc[relation_type] = relation_type.lower()
+        self.relation_type_index[relation_type].add(relation_id)
+        
+    def _entity_token_weights(self, entity: Entity) -> Dict[str, float]:
+        """Weight each token of an entity by the fields it appears in"""
+        
+        weights: Dict[str, float] = {}
+        fields = [
+            (entity.name, self.FIELD_WEIGHTS["name"]),
+            (entity.description, self.FIELD_WEIGHTS["description"]),
+            (entity.type, self.FIELD_WEIGHTS["type"])
+        ]
+        fields.extend(
+            (str(attr_value), self.FIELD_WEIGHTS["attributes"])
+            for attr_value in entity.attributes.values()
         )
         
-        self.remove_entity(least_important_id)
+        for text, weight in fields:
+            for token in set(_TOKEN_RE.findall(text.lower())):
+                weights[token] = weights.get(token, 0.0) + weight
+                
+        return weights
         
-    def _remove_least_important_relation(self) -> None:
-        """Remove the least important relation to make space"""
+    def _remove_entity_tokens(self, entity_id: str) -> None:
+        """Remove an entity from the token index"""
         
-        if not self.relations:
-            return
+        for token in self._entity_tokens.pop(entity_id, ()):
+            postings = self.token_index.get(token)
+            if postings is not None:
+                postings.pop(entity_id, None)
+                if not postings:
+                    del self.token_index[token]
+                    
+    def _rebuild_token_index(self) -> None:
+        """Rebuild the token index from the stored entities"""
+        
+        self.token_index = {}
+        self._entity_tokens = {}
+        for entity_id, entity in self.entities.items():
+            self._index_entity_tokens(entity_id, entity)
+                
+    def _recompute_importance_sums(self) -> None:
+        """Recompute the running importance totals from stored entities and relations"""
+        
+        self._entity_importance_sum = sum(e.importance for e in self.entities.values())
+        self._relation_importance_sum = sum(r["importance"] for r in self.relations.values())
+        
+    @staticmethod
+    def _eviction_score(entity: Entity) -> float:
+        """Score used to pick entities to evict; lowest goes first"""
+        return entity.importance * (1 + entity.access_count * 0.1)
+        
+    def _push_entity_score(self, entity_id: str, entity: Entity) -> None:
+        """Record an entity's current eviction score"""
+        
+        heapq.heappush(self._entity_heap, (self._eviction_score(entity), entity_id))
+        
+        # Accesses keep pushing fresh entries; drop the stale ones once they dominate
+        if len(self._entity_heap) > 2 * len(self.entities) + 64:
+            self._rebuild_eviction_heaps()
             
-        least_important_id = min(
-            self.relations.keys(),
-            key=lambda rid: self.relations[rid]["importance"]
-        )
+    def _rebuild_eviction_heaps(self) -> None:
+        """Rebuild both eviction heaps from the stored entities and relations"""
+        
+        self._entity_heap = [
+            (self._eviction_score(entity), entity_id)
+            for entity_id, entity in self.entities.items()
+        ]
+        heapq.heapify(self._entity_heap)
+        
+        self._relation_heap = [
+            (relation["importance"], relation_id)
+            for relation_id, relation in self.relations.items()
+        ]
+        heapq.heapify(self._relation_heap)
+        
+    def _remove_least_important_entity(self) -> None:
+        """Remove the least important entity to make space"""
         
-        self.remove_relation(least_important_id)
+        while self._entity_heap:
+            score, entity_id = heapq.heappop(self._entity_heap)
+            entity = self.entities.get(entity_id)
+            if entity is not None and self._eviction_score(entity) == score:
+                self.remove_entity(entity_id)
+                return
+                
+    def _remove_least_important_relation(self) -> None:
+        """Remove the least important relation to make space"""
         
+        while self._relation_heap:
+            importance, relation_id = heapq.heappop(self._relation_heap)
+            relation = self.relations.get(relation_id)
+            if relation is not None and relation["importance"] == importance:
+                self.remove_relation(relation_id)
+                return
+                
     def get_entity(self, entity_id: str) -> Optional[Dict[str, Any]]:
         """Get an entity by ID"""
         
         if entity_id in self.entities:
             entity = self.entities[entity_id]
-            entity["last_accessed"] = datetime.now()
-            entity["access_count"] += 1
+            entity.touch()
+            self._push_entity_score(entity_id, entity)
             return entity.copy()
             
         return None
@@ -257,121 +969,123 @@ class KnowledgeGraph:
         
         return self.relations.get(relation_id)
         
-    def query(self, query_text: str, limit: int = 10) -> List[Dict[str, Any]]:
+    def query(self, query_text: str, limit: int = 10,
+              relevance_threshold: float = 0.1) -> List[Dict[str, Any]]:
         """Query the knowledge graph for relevant entities and relations"""
         
-        query_lower = query_text.lower()
+        # Blank or one-character queries would match almost everything
+        query_lower = query_text.strip().lower()
+        if len(query_lower) < 2:
+            return []
+            
+        query_tokens = set(_TOKEN_RE.findall(query_lower))
         results = []
         
-        # Search entities
-        for entity_id, entity in self.entities.items():
-            relevance = 0.0
-            
-            # Name matching
-            if query_lower in entity["name"].lower():
-                relevance += 1.0
-                
-            # Description matching
-            if query_lower in entity["description"].lower():
-                relevance += 0.8
-                
-            # Attribute matching
-            for attr_value in entity["attributes"].values():
-                if query_lower in str(attr_value).lower():
-                    relevance += 0.5
+        # Search entities through the token index. Each query token adds the
+        # weight of the fields it appears in, so an entity whose name holds
+        # every query token scores a full name match.
+        if query_tokens:
+            scores: Counter = Counter()
+            for token in query_tokens:
+                postings = self.token_index.get(token)
+                if postings:
+                    scores.update(postings)
                     
-            # Type matching
-            if query_lower in entity["type"].lower():
-                relevance += 0.3
+            token_count = len(query_tokens)
+            candidates = []
+            for entity_id, score in scores.items():
+                # Boost by importance
+                relevance = score / token_count + self.entities[entity_id].importance * 0.3
+                if relevance >= relevance_threshold:
+                    candidates.append((relevance, entity_id))
+                    
+            # Only entities that can make the top results are copied out
+            for relevance, entity_id in heapq.nlargest(limit, candidates):
+                result = self.entities[entity_id].copy()
+                result["type"] = "entity"
+                result["relevance"] = relevance
+                results.append(result)
                 
-            # Boost by importance
-            relevance += entity["importance"] * 0.3
-            
-            if relevance > 0:
-                results.append({
-                    **entity,
-                    "type": "entity",
-                    "relevance": relevance
-                })
+        # Search relations by matching relation types
+        for relation_type, relation_type_lc in self._relation_types_lc.items():
+            if query_lower not in relation_type_lc:
+                continue
                 
-        # Search relations
-        for relation in self.relations.values():
-            relevance = 0.0
-            
-            # Relation type matching
-            if query_lower in relation["type"].lower():
-                relevance += 0.8
+            for relation_id in self.relation_type_index[relation_type]:
+                relation = self.relations[relation_id]
+                
+                # Boost by importance
+                relevance = 0.8 + relation["importance"] * 0.2
+                if relevance < relevance_threshold:
+                    continue
                 
-            # Boost by importance
-            relevance += relation["importance"] * 0.2
-            
-            if relevance > 0:
                 # Get source and target entity names
-                source_entity = self.entities.get(relation["source"], {})
-                target_entity = self.entities.get(relation["target"], {})
+                source_entity = self.entities.get(relation["source"])
+                target_entity = self.entities.get(relation["target"])
                 
                 results.append({
                     **relation,
                     "type": "relation",
-                    "source_name": source_entity.get("name", "Unknown"),
-                    "target_name": target_entity.get("name", "Unknown"),
+                    "source_name": source_entity.name if source_entity is not None else "Unknown",
+                    "target_name": target_entity.name if target_entity is not None else "Unknown",
                     "relevance": relevance
                 })
                 
-        # Sort by relevance and return top results
-        results.sort(key=lambda x: x["relevance"], reverse=True)
-        return results[:limit]
+        # Return the top results by relevance
+        return heapq.nlargest(limit, results, key=lambda x: x["relevance"])
+        
+    def _ensure_adjacency(self) -> Dict[str, Tuple[Tuple[str, frozenset], ...]]:
+        """Build the adjacency snapshot from the graph if it is out of date"""
+        
+        if self._adjacency is None:
+            self._adjacency = {
+                node_id: tuple(
+                    (neighbor_id, frozenset(edge_data.get("type") for edge_data in edges.values()))
+                    for neighbor_id, edges in neighbors.items()
+                )
+                for node_id, neighbors in self.graph.adjacency()
+            }
+        return self._adjacency
         
     def find_related_entities(self, entity_id: str, relation_types: Optional[List[str]] = None,
                              max_depth: int = 2) -> List[Dict[str, Any]]:
-        """Find entities related to a given entity"""
+        """Find entities related to a given entity
+        
+        Entities are found by a breadth-first walk along outgoing relations,
+        up to max_depth hops. With relation_types, only relations of those
+        types are followed.
+        """
         
-        if entity_id not in self.entities:
+        if entity_id not in self.entities or entity_id not in self.graph:
             return []
             
+        adjacency = self._ensure_adjacency()
+        allowed_types = frozenset(relation_types) if relation_types else None
         related_entities = []
         
-        try:
-            # Use networkx to find related entities
-            for target_id, path_info in nx.single_source_shortest_path_length(
-                self.graph, entity_id, cutoff=max_depth
-            ).items():
+        seen = {entity_id}
+        queue = deque([(entity_id, 0)])
+        while queue:
+            node_id, distance = queue.popleft()
+            if distance == max_depth:
+                continue
                 
-                if target_id == entity_id or target_id not in self.entities:
+            for neighbor_id, edge_types in adjacency.get(node_id, ()):
+                if neighbor_id in seen:
                     continue
-                    
-                # Check if path has valid relations
-                path = nx.shortest_path(self.graph, entity_id, target_id)
-                
-                if len(path) < 2:
+                if allowed_types is not None and allowed_types.isdisjoint(edge_types):
                     continue
                     
-                # Check relation types if specified
-                if relation_types:
-                    valid_path = False
-                    for i in range(len(path) - 1):
-                        edges = self.graph[path[i]][path[target_id]]
-                        for edge_data in edges.values():
-                            if edge_data.get("type") in relation_types:
-                                valid_path = True
-                                break
-                        if valid_path:
-                            break
-                            
-                    if not valid_path:
-                        continue
-                        
-                entity = self.get_entity(target_id)
+                seen.add(neighbor_id)
+                queue.append((neighbor_id, distance + 1))
+                
+                entity = self.get_entity(neighbor_id)
                 if entity:
-                    entity["relationship_distance"] = path_info
-                    entity["relationship_strength"] = 1.0 / (path_info + 1)
+                    entity["relationship_distance"] = distance + 1
+                    entity["relationship_strength"] = 1.0 / (distance + 2)
                     related_entities.append(entity)
                     
-        except nx.NetworkXError:
-            pass
-            
-        # Sort by relationship strength
-        related_entities.sort(key=lambda x: x["relationship_strength"], reverse=True)
+        # Breadth-first order is already nearest first, i.e. by descending strength
         return related_entities
         
     def find_entities_by_type(self, entity_type: str, limit: int = 10) -> List[Dict[str, Any]]:
@@ -380,15 +1094,19 @@ class KnowledgeGraph:
         if entity_type not in self.type_index:
             return []
             
+        # Pick the most important ids first so only returned entities are fetched
+        top_ids = heapq.nlargest(
+            limit, self.type_index[entity_type],
+            key=lambda eid: self.entities[eid].importance if eid in self.entities else float("-inf")
+        )
+        
         entities = []
-        for entity_id in self.type_index[entity_type]:
+        for entity_id in top_ids:
             entity = self.get_entity(entity_id)
             if entity:
                 entities.append(entity)
                 
-        # Sort by importance and return top results
-        entities.sort(key=lambda x: x["importance"], reverse=True)
-        return entities[:limit]
+        return entities
         
     def find_entities_by_attribute(self, attribute_name: str, attribute_value: str,
                                   limit: int = 10) -> List[Dict[str, Any]]:
@@ -398,78 +1116,97 @@ class KnowledgeGraph:
             attribute_value not in self.attribute_index[attribute_name]):
             return []
             
+        # Pick the most important ids first so only returned entities are fetched
+        top_ids = heapq.nlargest(
+            limit, self.attribute_index[attribute_name][attribute_value],
+            key=lambda eid: self.entities[eid].importance if eid in self.entities else float("-inf")
+        )
+        
         entities = []
-        for entity_id in self.attribute_index[attribute_name][attribute_value]:
+        for entity_id in top_ids:
             entity = self.get_entity(entity_id)
             if entity:
                 entities.append(entity)
                 
-        # Sort by importance and return top results
-        entities.sort(key=lambda x: x["importance"], reverse=True)
-        return entities[:limit]
+        return entities
         
     def remove_entity(self, entity_id: str) -> bool:
         """Remove an entity and all its relations"""
         
-        if entity_id not in self.entities:
-            return False
+        with self._change_lock:
+            if entity_id not in self.entities:
+                return False
+                
+            entity = self.entities[entity_id]
             
-        entity = self.entities[entity_id]
-        
-        # Remove from indexes
-        entity_type = entity["type"]
-        if entity_type in self.type_index:
-            self.type_index[entity_type].discard(entity_id)
+            # Remove from indexes
+            entity_type = entity.type
+            if entity_type in self.type_index:
+                self.type_index[entity_type].discard(entity_id)
+                
+            for attr_name, attr_value in entity.attributes.items():
+                if (attr_name in self.attribute_index and 
+                    attr_value in self.attribute_index[attr_name]):
+                    self.attribute_index[attr_name][attr_value].discard(entity_id)
+                    
+            self._remove_entity_tokens(entity_id)
             
-        for attr_name, attr_value in entity["attributes"].items():
-            if (attr_name in self.attribute_index and 
-                attr_value in self.attribute_index[attr_name]):
-                self.attribute_index[attr_name][attr_value].discard(entity_id)
+            # Remove relations
+            relations_to_remove = []
+            for relation_id, relation in self.relations.items():
+                if relation["source"] == entity_id or relation["target"] == entity_id:
+                    relations_to_remove.append(relation_id)
+                    
+            for relation_id in relations_to_remove:
+                self.remove_relation(relation_id)
                 
-        # Remove relations
-        relations_to_remove = []
-        for relation_id, relation in self.relations.items():
-            if relation["source"] == entity_id or relation["target"] == entity_id:
-                relations_to_remove.append(relation_id)
+            # Remove from graph and storage
+            if entity_id in self.graph:
+                self.graph.remove_node(entity_id)
                 
-        for relation_id in relations_to_remove:
-            self.remove_relation(relation_id)
+            del self.entities[entity_id]
+            self._entity_importance_sum -= entity.importance
             
-        # Remove from graph and storage
-        if entity_id in self.graph:
-            self.graph.remove_node(entity_id)
+            self.last_updated = datetime.now()
+            self._mark_dirty({"op": "del_entity", "id": entity_id})
             
-        del self.entities[entity_id]
-        
-        self.last_updated = datetime.now()
-        self._save_knowledge_graph()
-        
-        return True
+            return True
         
     def remove_relation(self, relation_id: str) -> bool:
         """Remove a relation"""
         
-        if relation_id not in self.relations:
-            return False
+        with self._change_lock:
+            if relation_id not in self.relations:
+                return False
+                
+            relation = self.relations[relation_id]
             
-        relation = self.relations[relation_id]
-        
-        # Remove from graph
-        if self.graph.has_edge(relation["source"], relation["target"], key=relation_id):
-            self.graph.remove_edge(relation["source"], relation["target"], key=relation_id)
+            # Remove from graph
+            if self.graph.has_edge(relation["source"], relation["target"], key=relation_id):
+                self.graph.remove_edge(relation["source"], relation["target"], key=relation_id)
+                
+            # Remove reverse edge if exists
+            reverse_id = f"reverse_{relation_id}"
+            if self.graph.has_edge(relation["target"], relation["source"], key=reverse_id):
+                self.graph.remove_edge(relation["target"], relation["source"], key=reverse_id)
+                
+            self._adjacency = None
             
-        # Remove reverse edge if exists
-        reverse_id = f"reverse_{relation_id}"
-        if self.graph.has_edge(relation["target"], relation["source"], key=reverse_id):
-            self.graph.remove_edge(relation["target"], relation["source"], key=reverse_id)
+            # Remove from storage
+            del self.relations[relation_id]
+            self._relation_importance_sum -= relation["importance"]
             
-        # Remove from storage
-        del self.relations[relation_id]
-        
-        self.last_updated = datetime.now()
-        self._save_knowledge_graph()
-        
-        return True
+            type_relations = self.relation_type_index.get(relation["type"])
+            if type_relations is not None:
+                type_relations.discard(relation_id)
+                if not type_relations:
+                    del self.relation_type_index[relation["type"]]
+                    del self._relation_types_lc[relation["type"]]
+            
+            self.last_updated = datetime.now()
+            self._mark_dirty({"op": "del_rel", "id": relation_id})
+            
+            return True
         
     def cleanup(self) -> None:
         """Clean up the knowledge graph by removing low-importance items"""
@@ -479,7 +1216,7 @@ class KnowledgeGraph:
         # Remove entities with very low importance
         entities_to_remove = []
         for entity_id, entity in self.entities.items():
-            if entity["importance"] < 0.1 and entity["access_count"] == 0:
+            if entity.importance < 0.1 and entity.access_count == 0:
                 entities_to_remove.append(entity_id)
                 
         for entity_id in entities_to_remove:
@@ -508,12 +1245,12 @@ class KnowledgeGraph:
             "indexed_attributes": len(self.attribute_index),
             "creation_time": self.creation_time.isoformat(),
             "last_updated": self.last_updated.isoformat(),
-            "average_entity_importance": np.mean([
-                e["importance"] for e in self.entities.values()
-            ]) if self.entities else 0.0,
-            "average_relation_importance": np.mean([
-                r["importance"] for r in self.relations.values()
-            ]) if self.relations else 0.0
+            "average_entity_importance": (
+                self._entity_importance_sum / len(self.entities) if self.entities else 0.0
+            ),
+            "average_relation_importance": (
+                self._relation_importance_sum / len(self.relations) if self.relations else 0.0
+            )
         }
         
     def to_dict(self) -> Dict[str, Any]:
@@ -522,8 +1259,8 @@ class KnowledgeGraph:
         serializable_entities = {}
         for entity_id, entity in self.entities.items():
             serializable_entity = entity.copy()
-            serializable_entity["created_at"] = entity["created_at"].isoformat()
-            serializable_entity["last_accessed"] = entity["last_accessed"].isoformat()
+            serializable_entity["created_at"] = entity.created_at.isoformat()
+            serializable_entity["last_accessed"] = entity.last_accessed.isoformat()
             serializable_entities[entity_id] = serializable_entity
             
         serializable_relations = {}
@@ -546,42 +1283,44 @@ class KnowledgeGraph:
     def from_dict(self, data: Dict[str, Any]) -> None:
         """Load knowledge graph from dictionary"""
         
-        # Load entities
-        self.entities.clear()
-        for entity_id, entity_data in data.get("entities", {}).items():
-            entity = entity_data.copy()
-            entity["created_at"] = datetime.fromisoformat(entity["created_at"])
-            entity["last_accessed"] = datetime.fromisoformat(entity["last_accessed"])
-            self.entities[entity_id] = entity
-            
-        # Load relations
-        self.relations.clear()
-        for relation_id, relation_data in data.get("relations", {}).items():
-            relation = relation_data.copy()
-            relation["created_at"] = datetime.fromisoformat(relation["created_at"])
-            self.relations[relation_id] = relation
-            
-        # Rebuild indexes
-        self.type_index = {k: set(v) for k, v in data.get("type_index", {}).items()}
-        self.attribute_index = {
-            k: {attr: set(vals) for attr, vals in v.items()}
-            for k, v in data.get("attribute_index", {}).items()
-        }
-        
-        # Rebuild graph
-        self.graph = nx.MultiDiGraph()
-        
-        # Add nodes
-        for entity_id, entity in self.entities.items():
-            self.graph.add_node(entity_id, **entity)
+        with self._change_lock:
+            # Load entities
+            self.entities.clear()
+            for entity_id, entity_data in data.get("entities", {}).items():
+                entity = Entity.from_mapping(entity_data).intern_strings()
+                entity.created_at = datetime.fromisoformat(entity.created_at)
+                entity.last_accessed = datetime.fromisoformat(entity.last_accessed)
+                self.entities[entity_id] = entity
+                
+            # Load relations
+            self.relations.clear()
+            for relation_id, relation_data in data.get("relations", {}).items():
+                relation = relation_data.copy()
+                relation["type"] = _intern(relation["type"])
+                relation["created_at"] = datetime.fromisoformat(relation["created_at"])
+                self.relations[relation_id] = relation
+                
+            # Rebuild indexes
+            self._rebuild_token_index()
+            self._recompute_importance_sums()
+            self._rebuild_eviction_heaps()
+            self.relation_type_index = {}
+            self._relation_types_lc = {}
+            for relation_id, relation in self.relations.items():
+                self._index_relation_type(relation_id, relation["type"])
+            self.type_index = {_intern(k): set(v) for k, v in data.get("type_index", {}).items()}
+            self.attribute_index = {
+                _intern(k): {_intern(attr): set(vals) for attr, vals in v.items()}
+                for k, v in data.get("attribute_index", {}).items()
+            }
             
-        # Add edges
-        for relation in self.relations.values():
-            self.graph.add_edge(
-                relation["source"],
-                relation["target"],
-                key=relation["id"],
-                **relation
-            )
+            # Rebuild graph
+            self.graph = _build_graph(self.entities, self.relations)
+            self._adjacency = None
             
+            # The op-log does not cover a wholesale load; snapshot the new state
+            self.version += 1
+            self._dirty = True
+        self._request_save()
+        
         logger.info("Knowledge graph loaded from dictionary")
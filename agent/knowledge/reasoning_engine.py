@@ -2,25 +2,163 @@
 Reasoning engine for logical inference and knowledge deduction
 """
 
-from typing import Dict, Any, List, Optional, Set, Tuple
-from datetime import datetime
+import os
+import time
+import hashlib
+import heapq
+import itertools
+import atexit
+import shelve
+from collections import OrderedDict
+from collections.abc import Mapping
+from operator import attrgetter, itemgetter
+from typing import Dict, Any, Iterator, List, Optional, Set, Tuple
 import networkx as nx
 from loguru import logger
 
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# Maximum number of (query, depth) results kept in the inference cache
+MAX_CACHED_INFERENCES = 1024
+
+# Maximum number of (entity, depth) graph traversals kept for graph reasoning
+MAX_CACHED_TRAVERSALS = 1024
+
+# Inferences that take at least this long to compute are also cached on disk
+MIN_PERSIST_SECONDS = 0.01
+
+
+class Inference(Mapping):
+    """Inference record with fixed slotted fields and read-only dict-style access
+    
+    Candidate inferences are built in this form while infer ranks them, to
+    avoid a dict per candidate; the ones returned are turned into plain
+    dicts by copy(). Fields that are the same for every inference of a kind
+    are class attributes.
+    """
+    
+    FIELDS: Tuple[str, ...] = ()
+    __slots__ = ()
+    
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+        
+    def __iter__(self):
+        return iter(self.FIELDS)
+        
+    def __len__(self) -> int:
+        return len(self.FIELDS)
+        
+    def copy(self) -> Dict[str, Any]:
+        """Return the inference as a plain dict"""
+        return dict(zip(self.FIELDS, self._values(self)))
+
+
+class RuleInference(Inference):
+    """Inference drawn from a reasoning rule whose premise is in the query"""
+    
+    FIELDS = ("id", "type", "content", "rule_applied", "confidence", "relevance", "reasoning_type")
+    __slots__ = ("id", "content", "rule_applied", "confidence")
+    
+    type = "inference"
+    relevance = 0.7
+    reasoning_type = "rule_based"
+    
+    def __init__(self, id: str, content: str, rule_applied: str, confidence: float):
+        self.id = id
+        self.content = content
+        self.rule_applied = rule_applied
+        self.confidence = confidence
+
+
+class GraphInference(Inference):
+    """Inference that a query entity is related to another entity in the graph"""
+    
+    FIELDS = ("id", "type", "content", "source_entity", "target_entity", "relationship_strength",
+              "relationship_distance", "confidence", "relevance", "reasoning_type")
+    __slots__ = ("id", "source_entity", "target_entity", "relationship_strength", "relationship_distance")
+    
+    type = "graph_inference"
+    reasoning_type = "graph_based"
+    
+    def __init__(self, id: str, source_entity: Any, target_entity: Any,
+                 relationship_strength: float, relationship_distance: int):
+        self.id = id
+        self.source_entity = source_entity
+        self.target_entity = target_entity
+        self.relationship_strength = relationship_strength
+        self.relationship_distance = relationship_distance
+        
+    @property
+    def content(self) -> str:
+        return f"{self.source_entity} is related to {self.target_entity}"
+        
+    @property
+    def confidence(self) -> float:
+        return self.relationship_strength
+        
+    @property
+    def relevance(self) -> float:
+        return self.relationship_strength * 0.8
+
+
+for _inference_class in (RuleInference, GraphInference):
+    _inference_class._KEYS = frozenset(_inference_class.FIELDS)
+    _inference_class._values = staticmethod(attrgetter(*_inference_class.FIELDS))
+
 
 class ReasoningEngine:
     """Reasoning engine for logical inference and knowledge deduction"""
     
-    def __init__(self, knowledge_graph):
+    def __init__(self, knowledge_graph, cache_dir: Optional[str] = None):
         self.knowledge_graph = knowledge_graph
         self.reasoning_rules = []
-        self.inference_cache = {}
+        self._rule_counter = itertools.count()
+        
+        # Digest of the rules added so far, in order, so cached results
+        # computed under a different rule set are never reused
+        self._rules_fingerprint = ""
+        
+        # Lowercased premise -> indexes of the rules that have it, and (if
+        # available) an automaton over the premises, rebuilt when rules change
+        self._premise_index: Dict[str, List[int]] = {}
+        self._premise_automaton = None
+        
+        # LRU cache of inference results, plus the cached results with each
+        # id, oldest cache entry first, for explain_reasoning
+        self.inference_cache: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self.max_cache_size = MAX_CACHED_INFERENCES
+        self._inference_by_id: Dict[str, List[Dict[str, Any]]] = {}
+        
+        # LRU memo of find_related_entities per (entity id, depth), valid for
+        # the knowledge graph version it was filled at
+        self._related_memo: "OrderedDict[Tuple[str, int], List[Dict[str, Any]]]" = OrderedDict()
+        self._related_memo_version = None
+        
+        # Optional on-disk cache that survives restarts, keyed by the knowledge
+        # graph version and the rule set as well so any change to either
+        # invalidates it. The directory defaults to the graph's configuration.
+        if cache_dir is None:
+            config = getattr(knowledge_graph, "config", None)
+            cache_dir = getattr(config, "reasoning_cache_dir", None)
+        self._disk_cache = None
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._disk_cache = shelve.open(os.path.join(cache_dir, "inference_cache"))
+            atexit.register(self.close)
         
     def add_rule(self, rule: Dict[str, Any]) -> None:
         """Add a reasoning rule"""
         
+        rule_id = rule["id"] if "id" in rule else f"rule_{next(self._rule_counter)}"
         rule_data = {
-            "id": rule.get("id", f"rule_{datetime.now().timestamp()}"),
+            "id": rule_id,
             "name": rule.get("name", ""),
             "premises": rule.get("premises", []),
             "conclusion": rule.get("conclusion", ""),
@@ -29,6 +167,18 @@ class ReasoningEngine:
         }
         
         self.reasoning_rules.append(rule_data)
+        rule_index = len(self.reasoning_rules) - 1
+        for premise in rule_data["premises"]:
+            self._premise_index.setdefault(premise.lower(), []).append(rule_index)
+        self._premise_automaton = None
+        
+        # Results cached under the previous rule set are now stale
+        self._rules_fingerprint = hashlib.blake2b(
+            f"{self._rules_fingerprint}{rule_data!r}".encode(), digest_size=8
+        ).hexdigest()
+        self.inference_cache.clear()
+        self._inference_by_id.clear()
+            
         logger.info(f"Added reasoning rule: {rule_data['name']}")
         
     def infer(self, query: str, max_depth: int = 3) -> List[Dict[str, Any]]:
@@ -36,132 +186,196 @@ class ReasoningEngine:
         
         # Check cache first
         cache_key = f"{query}_{max_depth}"
-        if cache_key in self.inference_cache:
-            return self.inference_cache[cache_key]
+        cached = self.inference_cache.get(cache_key)
+        if cached is not None:
+            self.inference_cache.move_to_end(cache_key)
+            return cached
             
-        results = []
-        
-        # Direct knowledge lookup
-        direct_results = self.knowledge_graph.query(query)
-        results.extend(direct_results)
-        
-        # Rule-based inference
-        rule_results = self._apply_rules(query)
-        results.extend(rule_results)
+        disk_key = None
+        if self._disk_cache is not None:
+            disk_key = f"{cache_key}_{self.knowledge_graph.version}_{self._rules_fingerprint}"
+            try:
+                cached = self._disk_cache.get(disk_key)
+            except Exception as e:
+                logger.warning(f"Failed to read inference cache: {e}")
+            if cached is not None:
+                self._cache_inference(cache_key, cached)
+                return cached
+                
+        started = time.perf_counter()
         
-        # Graph-based reasoning
-        graph_results = self._graph_reasoning(query, max_depth)
-        results.extend(graph_results)
+        # The query is lowercased once for the rule and graph passes
+        query_lower = query.lower()
         
-        # Remove duplicates and sort by relevance
-        unique_results = []
-        seen_ids = set()
+        # Direct knowledge lookup, then rule-based inference, then graph-based
+        # reasoning; the latter two are generated as they are consumed below
+        # rather than collected into lists first
+        results = itertools.chain(
+            self.knowledge_graph.query(query),
+            self._apply_rules(query_lower),
+            self._graph_reasoning(query_lower, max_depth)
+        )
         
+        # Keep the most relevant result per id (results without one are all
+        # kept), then the top results by relevance. Every result, direct or
+        # inferred, carries a relevance.
+        best_results: Dict[Any, Dict[str, Any]] = {}
         for result in results:
-            result_id = result.get("id", str(result))
-            if result_id not in seen_ids:
-                unique_results.append(result)
-                seen_ids.add(result_id)
+            result_id = result.get("id")
+            if result_id is None:
+                result_id = id(result)
+            current = best_results.get(result_id)
+            if current is None or result["relevance"] > current["relevance"]:
+                best_results[result_id] = result
                 
-        unique_results.sort(key=lambda x: x.get("relevance", 0), reverse=True)
+        top_results = [
+            result.copy() if isinstance(result, Inference) else result
+            for result in heapq.nlargest(10, best_results.values(), key=itemgetter("relevance"))
+        ]
         
         # Cache results
-        self.inference_cache[cache_key] = unique_results[:10]
-        
-        return unique_results[:10]
+        self._cache_inference(cache_key, top_results)
         
-    def _apply_rules(self, query: str) -> List[Dict[str, Any]]:
-        """Apply reasoning rules to generate inferences"""
+        # Only persist results that were slow enough to be worth the write
+        if disk_key is not None and time.perf_counter() - started >= MIN_PERSIST_SECONDS:
+            try:
+                self._disk_cache[disk_key] = top_results
+            except Exception as e:
+                logger.warning(f"Failed to write inference cache: {e}")
+                
+        return top_results
         
-        results = []
-        query_lower = query.lower()
+    def _cache_inference(self, cache_key: str, results: List[Dict[str, Any]]) -> None:
+        """Cache results, evicting the least recently used entries beyond the limit"""
         
-        for rule in self.reasoning_rules:
-            # Check if rule premises match query
-            premises_match = any(
-                premise.lower() in query_lower 
-                for premise in rule["premises"]
-            )
+        self.inference_cache[cache_key] = results
+        for result in results:
+            self._inference_by_id.setdefault(result.get("id"), []).append(result)
             
-            if premises_match:
-                inference = {
-                    "id": f"inference_{rule['id']}",
-                    "type": "inference",
-                    "content": rule["conclusion"],
-                    "rule_applied": rule["name"],
-                    "confidence": rule["confidence"],
-                    "relevance": 0.7,
-                    "reasoning_type": "rule_based"
-                }
-                results.append(inference)
+        while len(self.inference_cache) > self.max_cache_size:
+            _, evicted = self.inference_cache.popitem(last=False)
+            for result in evicted:
+                result_id = result.get("id")
+                same_id = self._inference_by_id[result_id]
+                same_id[:] = [other for other in same_id if other is not result]
+                if not same_id:
+                    del self._inference_by_id[result_id]
+        
+    def _apply_rules(self, query_lower: str) -> Iterator[Dict[str, Any]]:
+        """Apply reasoning rules to generate inferences for a lowercased query"""
+        
+        # Rules with any premise in the query: with the automaton, one pass
+        # over the query finds every premise in it, however many rules there
+        # are; otherwise each distinct premise is tested once
+        matched_rules = set()
+        automaton = self._ensure_premise_automaton()
+        if automaton is not None:
+            matched_rules.update(self._premise_index.get("", ()))
+            for _, premise in automaton.iter(query_lower):
+                matched_rules.update(self._premise_index[premise])
+        else:
+            for premise, rule_indexes in self._premise_index.items():
+                if premise in query_lower:
+                    matched_rules.update(rule_indexes)
                 
-        return results
+        for rule_index in sorted(matched_rules):
+            rule = self.reasoning_rules[rule_index]
+            yield RuleInference(f"inference_{rule['id']}", rule["conclusion"], rule["name"], rule["confidence"])
         
-    def _graph_reasoning(self, query: str, max_depth: int) -> List[Dict[str, Any]]:
-        """Perform reasoning using the knowledge graph structure"""
+    def _ensure_premise_automaton(self):
+        """The automaton over the rule premises, or None without ahocorasick"""
         
-        results = []
-        query_lower = query.lower()
+        # An automaton without words cannot be scanned, so rules whose only
+        # premise is empty are left to the fallback
+        if self._premise_automaton is None and AHOCORASICK_AVAILABLE and self._premise_index.keys() - {""}:
+            automaton = ahocorasick.Automaton()
+            for premise in self._premise_index:
+                if premise:
+                    automaton.add_word(premise, premise)
+            automaton.make_automaton()
+            self._premise_automaton = automaton
+            
+        return self._premise_automaton
+        
+    def _graph_reasoning(self, query_lower: str, max_depth: int) -> Iterator[Dict[str, Any]]:
+        """Perform reasoning using the knowledge graph structure for a lowercased query"""
         
         # Find entities related to query
         query_results = self.knowledge_graph.query(query_lower)
         
         for entity_result in query_results:
-            if entity_result.get("type") == "entity":
-                entity_id = entity_result.get("id")
+            if entity_result["type"] == "entity":
+                entity_id = entity_result["id"]
+                source_name = entity_result["name"]
                 
                 # Find related entities through graph traversal
-                related_entities = self.knowledge_graph.find_related_entities(
-                    entity_id, max_depth=max_depth
-                )
+                related_entities = self._find_related_entities(entity_id, max_depth)
                 
                 for related in related_entities:
                     # Generate inference about relationship
-                    inference = {
-                        "id": f"graph_inference_{entity_id}_{related['id']}",
-                        "type": "graph_inference",
-                        "content": f"{entity_result.get('name', 'Entity')} is related to {related.get('name', 'Related entity')}",
-                        "source_entity": entity_result.get("name"),
-                        "target_entity": related.get("name"),
-                        "relationship_strength": related.get("relationship_strength", 0),
-                        "relationship_distance": related.get("relationship_distance", 0),
-                        "confidence": related.get("relationship_strength", 0),
-                        "relevance": related.get("relationship_strength", 0) * 0.8,
-                        "reasoning_type": "graph_based"
-                    }
-                    results.append(inference)
-                    
-        return results
+                    yield GraphInference(
+                        f"graph_inference_{entity_id}_{related['id']}", source_name, related["name"],
+                        related["relationship_strength"], related["relationship_distance"]
+                    )
+        
+    def _find_related_entities(self, entity_id: str, max_depth: int) -> List[Dict[str, Any]]:
+        """find_related_entities, memoized until the knowledge graph changes"""
         
+        version = self.knowledge_graph.version
+        if version != self._related_memo_version:
+            self._related_memo.clear()
+            self._related_memo_version = version
+            
+        key = (entity_id, max_depth)
+        related_entities = self._related_memo.get(key)
+        if related_entities is not None:
+            self._related_memo.move_to_end(key)
+            return related_entities
+            
+        related_entities = self.knowledge_graph.find_related_entities(entity_id, max_depth=max_depth)
+        self._related_memo[key] = related_entities
+        if len(self._related_memo) > MAX_CACHED_TRAVERSALS:
+            self._related_memo.popitem(last=False)
+        return related_entities
+        
+    def close(self) -> None:
+        """Close the on-disk inference cache"""
+        
+        if self._disk_cache is not None:
+            self._disk_cache.close()
+            self._disk_cache = None
+            
     def explain_reasoning(self, inference_id: str) -> Dict[str, Any]:
         """Explain the reasoning process for an inference"""
         
         # Find the inference in recent results
-        for cached_results in self.inference_cache.values():
-            for result in cached_results:
-                if result.get("id") == inference_id:
-                    explanation = {
-                        "inference": result,
-                        "explanation": self._generate_explanation(result),
-                        "confidence_factors": self._analyze_confidence_factors(result)
-                    }
-                    return explanation
-                    
+        same_id = self._inference_by_id.get(inference_id)
+        if same_id:
+            result = same_id[0]
+            explanation = {
+                "inference": result,
+                "explanation": self._generate_explanation(result),
+                "confidence_factors": self._analyze_confidence_factors(result)
+            }
+            return explanation
+            
         return {"error": "Inference not found"}
         
     def _generate_explanation(self, inference: Dict[str, Any]) -> str:
         """Generate explanation for an inference"""
         
+        # Direct results have no reasoning type; the rule and graph inferences
+        # built in this module always have every field used below
         reasoning_type = inference.get("reasoning_type", "unknown")
         
         if reasoning_type == "rule_based":
-            rule_name = inference.get("rule_applied", "unknown rule")
+            rule_name = inference["rule_applied"]
             return f"This conclusion was derived using the reasoning rule: {rule_name}"
             
         elif reasoning_type == "graph_based":
-            source = inference.get("source_entity", "unknown entity")
-            target = inference.get("target_entity", "unknown entity")
-            strength = inference.get("relationship_strength", 0)
+            source = inference["source_entity"]
+            target = inference["target_entity"]
+            strength = inference["relationship_strength"]
             return f"This inference is based on the relationship between {source} and {target} (strength: {strength:.2f})"
             
         else:
@@ -195,7 +409,7 @@ class ReasoningEngine:
             "total_rules": len(self.reasoning_rules),
             "cached_inferences": len(self.inference_cache),
             "rule_types": {
-                rule_type: len([r for r in self.reasoning_rules if r.get("type") == rule_type])
-                for rule_type in set(r.get("type", "unknown") for r in self.reasoning_rules)
+                rule_type: len([r for r in self.reasoning_rules if r["type"] == rule_type])
+                for rule_type in set(r["type"] for r in self.reasoning_rules)
             }
         }
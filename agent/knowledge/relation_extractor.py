@@ -3,9 +3,65 @@ Relation extraction component for identifying relationships between entities
 """
 
 import re
+from bisect import bisect_right
+from collections import Counter, namedtuple
+from operator import itemgetter
 from typing import Dict, Any, List, Optional, Tuple
 from loguru import logger
 
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
+
+# Every relation pattern reads "<entity> connector <entity>" with this group
+# on both sides
+_ENTITY_GROUP = r'(\w+(?:\s+\w+)*)'
+
+
+# Per-call index of the entities that relation endpoints are matched against:
+# exact maps lowercased text to the first entity with it, lowered holds
+# (lowercased text, length, entity) in entity order, joined is every
+# lowercased text separated by NUL with offsets giving where each starts,
+# and automaton (if available) finds the entity texts inside a string
+_EntityIndex = namedtuple("_EntityIndex", "exact lowered joined offsets automaton")
+
+
+_STAT_FIELDS = itemgetter("type", "confidence", "extraction_method")
+
+# Entity type pairs whose pattern-based relations are more reliable
+_RELIABLE_TYPE_PAIRS = frozenset([
+    ("person", "organization"),
+    ("organization", "location"),
+    ("person", "location"),
+    ("organization", "organization")
+])
+
+# Context words that _infer_relation_type looks for anywhere in the text
+# (as substrings, so "works" and "employees" count), one search per group
+_WORK_CUES = re.compile("work|job|employee|staff")
+_LOCATION_CUES = re.compile("located|based|headquarters")
+_FAMILY_CUES = re.compile("family|married|parent|child")
+
+# Characters outside what the hyperscan gates are compiled for: non-ASCII,
+# and the separators \x1c-\x1f, which Python counts as \s but hyperscan does not
+_NOT_HYPERSCAN_SAFE = re.compile(r'[^\x00-\x1b\x20-\x7f]')
+
+
+def _connector(pattern: str) -> Optional[str]:
+    """The part of a relation pattern between its two entity groups, if it has that form"""
+    if (len(pattern) > 2 * len(_ENTITY_GROUP) and
+            pattern.startswith(_ENTITY_GROUP) and pattern.endswith(_ENTITY_GROUP)):
+        return pattern[len(_ENTITY_GROUP):-len(_ENTITY_GROUP)]
+    return None
+
 
 class RelationExtractor:
     """Relation extractor for identifying relationships between entities"""
@@ -92,47 +148,93 @@ class RelationExtractor:
             "part_of": 0.6
         }
         
+        # Compile patterns once rather than on every extraction call
+        self._compiled_patterns: Dict[str, List[re.Pattern]] = {
+            relation_type: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+            for relation_type, patterns in self.relation_patterns.items()
+        }
+        
+        # A pattern matches somewhere exactly when its connector does, between
+        # two word characters. Connectors are cheap to find, unlike the
+        # backtracking entity groups, so each pattern is gated on its own
+        # connector and all connectors are fused into one alternation that
+        # rejects text holding none of them in a single pass. Patterns of
+        # another form get no gate and are always run.
+        self._connector_gates: Dict[str, List[Optional[re.Pattern]]] = {}
+        connectors = []
+        gate_connectors: Dict[int, str] = {}
+        position = 0
+        for relation_type, patterns in self.relation_patterns.items():
+            gates = []
+            for pattern in patterns:
+                connector = _connector(pattern)
+                position += 1
+                if connector is None:
+                    gates.append(None)
+                    connectors = None
+                    continue
+                gates.append(re.compile(r'(?<=\w)(?:' + connector + r')(?=\w)', re.IGNORECASE))
+                gate_connectors[position - 1] = connector
+                if connectors is not None:
+                    connectors.append(connector)
+            self._connector_gates[relation_type] = gates
+        self._connector_re: Optional[re.Pattern] = None
+        if connectors:
+            self._connector_re = re.compile(
+                r'(?<=\w)(?:' + '|'.join(connectors) + r')(?=\w)', re.IGNORECASE
+            )
+            
+        # With hyperscan, all gates are checked together in one scan of the
+        # text instead, keyed by the position of their pattern in
+        # _compiled_patterns order
+        self._gate_database = None
+        if HYPERSCAN_AVAILABLE and gate_connectors:
+            self._gate_database = self._compile_gate_database(gate_connectors)
+        
     def extract_relations(self, text: str, entities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Extract relations between entities in text"""
         
         relations = []
         
-        # Extract relations using patterns
-        for relation_type, patterns in self.relation_patterns.items():
-            for pattern in patterns:
-                matches = re.finditer(pattern, text, re.IGNORECASE)
-                for match in matches:
-                    try:
-                        source_text = match.group(1).strip()
-                        target_text = match.group(2).strip()
-                        
-                        # Find corresponding entities
-                        source_entity = self._find_best_entity_match(source_text, entities)
-                        target_entity = self._find_best_entity_match(target_text, entities)
+        # Extract relations using patterns, skipping those whose connector is absent
+        candidates = self._candidate_patterns(text)
+            
+        # Index entities once for all lookups below
+        entity_index = self._build_entity_index(entities) if candidates else None
+        
+        for relation_type, pattern in candidates:
+            for match in pattern.finditer(text):
+                try:
+                    source_text = match.group(1).strip()
+                    target_text = match.group(2).strip()
+                    
+                    # Find corresponding entities
+                    source_entity = self._find_best_entity_match(source_text, entity_index)
+                    target_entity = self._find_best_entity_match(target_text, entity_index)
+                    
+                    if source_entity and target_entity:
+                        # Calculate confidence
+                        base_confidence = self.pattern_confidence.get(relation_type, 0.5)
+                        confidence = self._calculate_relation_confidence(
+                            source_text, target_text, source_entity, target_entity, base_confidence
+                        )
                         
-                        if source_entity and target_entity:
-                            # Calculate confidence
-                            base_confidence = self.pattern_confidence.get(relation_type, 0.5)
-                            confidence = self._calculate_relation_confidence(
-                                source_text, target_text, source_entity, target_entity, base_confidence
-                            )
-                            
-                            relation = {
-                                "type": relation_type,
-                                "source": source_entity,
-                                "target": target_entity,
-                                "source_text": source_text,
-                                "target_text": target_text,
-                                "confidence": confidence,
-                                "pattern": pattern,
-                                "extraction_method": "pattern_based"
-                            }
-                            relations.append(relation)
-                            
-                    except IndexError:
-                        # Pattern didn't capture expected groups
-                        continue
+                        relation = {
+                            "type": relation_type,
+                            "source": source_entity,
+                            "target": target_entity,
+                            "source_text": source_text,
+                            "target_text": target_text,
+                            "confidence": confidence,
+                            "pattern": pattern.pattern,
+                            "extraction_method": "pattern_based"
+                        }
+                        relations.append(relation)
                         
+                except IndexError:
+                    # Pattern didn't capture expected groups
+                    continue
+                    
         # Extract relations using co-occurrence and heuristics
         cooccurrence_relations = self._extract_cooccurrence_relations(text, entities)
         relations.extend(cooccurrence_relations)
@@ -143,33 +245,119 @@ class RelationExtractor:
         
         return unique_relations
         
-    def _find_best_entity_match(self, text: str, entities: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
-        """Find the best matching entity for given text"""
+    def _compile_gate_database(self, gate_connectors: Dict[int, str]):
+        """Compile the connector gates, by pattern position, into one hyperscan database"""
         
-        text_lower = text.lower()
-        best_match = None
-        best_score = 0
+        # Hyperscan has no lookbehind, so the surrounding word characters are
+        # matched instead; only whether each gate matches at all is used.
+        # Unicode classes (UTF8 | UCP) make compiling take seconds, so the
+        # database is ASCII-only and other text uses the regex gates.
+        ids = sorted(gate_connectors)
+        expressions = [(r'\w(?:' + gate_connectors[i] + r')\w').encode("ascii") for i in ids]
+        flags = hyperscan.HS_FLAG_CASELESS
+        try:
+            database = hyperscan.Database()
+            database.compile(expressions=expressions, ids=ids, elements=len(ids),
+                             flags=[flags | hyperscan.HS_FLAG_SINGLEMATCH] * len(ids))
+            return database
+        except Exception as e:
+            logger.warning(f"Failed to compile relation gates with hyperscan: {e}")
+            return None
+            
+    def _candidate_patterns(self, text: str) -> List[Tuple[str, re.Pattern]]:
+        """The (relation type, compiled pattern) pairs whose connector gate lets text through"""
+        
+        open_gates = None
+        if self._gate_database is not None and not _NOT_HYPERSCAN_SAFE.search(text):
+            open_gates = set()
+            self._gate_database.scan(
+                text.encode("ascii"), match_event_handler=lambda gate_id, *_: open_gates.add(gate_id)
+            )
+                
+        if open_gates is None and self._connector_re is not None and not self._connector_re.search(text):
+            return []
+            
+        candidates = []
+        position = 0
+        for relation_type, patterns in self._compiled_patterns.items():
+            for pattern, gate in zip(patterns, self._connector_gates[relation_type]):
+                if gate is None or (position in open_gates if open_gates is not None else gate.search(text)):
+                    candidates.append((relation_type, pattern))
+                position += 1
+                
+        return candidates
         
+    def _build_entity_index(self, entities: List[Dict[str, Any]]) -> _EntityIndex:
+        """Index entities by lowercased text for _find_best_entity_match"""
+        
+        exact: Dict[str, Dict[str, Any]] = {}
+        lowered = []
+        offsets = []
+        offset = 0
         for entity in entities:
             entity_text = entity["text"].lower()
+            exact.setdefault(entity_text, entity)
+            lowered.append((entity_text, len(entity_text), entity))
+            offsets.append(offset)
+            offset += len(entity_text) + 1
+            
+        automaton = None
+        if AHOCORASICK_AVAILABLE and exact.keys() - {""}:
+            automaton = ahocorasick.Automaton()
+            for i, (entity_text, _, _) in enumerate(lowered):
+                if entity_text and entity_text not in automaton:
+                    automaton.add_word(entity_text, i)
+            automaton.make_automaton()
+            
+        joined = "\0".join(entity_text for entity_text, _, _ in lowered)
+        return _EntityIndex(exact, lowered, joined, offsets, automaton)
+        
+    def _find_best_entity_match(self, text: str, entity_index: _EntityIndex) -> Optional[Dict[str, Any]]:
+        """Find the best matching entity for given text, using the index built by extract_relations"""
+        
+        text_lower = text.lower()
+        
+        # Exact match
+        hit = entity_index.exact.get(text_lower)
+        if hit is not None:
+            return hit
+            
+        lowered = entity_index.lowered
+        offsets = entity_index.offsets
+        candidates = set()
+        
+        # Entities containing the text: search the joined texts, resuming at
+        # the next entity after each hit (NUL never occurs in matched text)
+        joined = entity_index.joined
+        position = joined.find(text_lower)
+        while position != -1:
+            i = bisect_right(offsets, position) - 1
+            candidates.add(i)
+            if i + 1 == len(offsets):
+                break
+            position = joined.find(text_lower, offsets[i + 1])
+            
+        # Entities contained in the text
+        if entity_index.automaton is not None:
+            candidates.update(i for _, i in entity_index.automaton.iter(text_lower))
+        else:
+            candidates.update(
+                i for i, (entity_text, _, _) in enumerate(lowered) if entity_text in text_lower
+            )
             
-            # Exact match
-            if entity_text == text_lower:
-                return entity
+        # Partial match scoring: the shorter text's share of the longer one,
+        # earliest entity first on ties
+        text_length = len(text_lower)
+        best_match = None
+        best_score = 0
+        
+        for i in sorted(candidates):
+            _, entity_length, entity = lowered[i]
+            score = min(text_length, entity_length) / max(text_length, entity_length)
+            if score > best_score:
+                best_score = score
+                best_match = entity
                 
-            # Partial match scoring
-            if text_lower in entity_text:
-                score = len(text_lower) / len(entity_text)
-                if score > best_score:
-                    best_score = score
-                    best_match = entity
-                    
-            elif entity_text in text_lower:
-                score = len(entity_text) / len(text_lower)
-                if score > best_score:
-                    best_score = score
-                    best_match = entity
-                    
         # Return best match if score is reasonable
         if best_match and best_score > 0.5:
             return best_match
@@ -190,19 +378,9 @@ class RelationExtractor:
         match_quality = (source_match_ratio + target_match_ratio) / 2
         confidence *= match_quality
         
-        # Boost confidence based on entity types
-        source_type = source_entity.get("type", "")
-        target_type = target_entity.get("type", "")
-        
-        # Certain type combinations are more reliable
-        reliable_combinations = [
-            ("person", "organization"),
-            ("organization", "location"),
-            ("person", "location"),
-            ("organization", "organization")
-        ]
-        
-        if (source_type, target_type) in reliable_combinations:
+        # Boost confidence based on entity types; certain type combinations
+        # are more reliable
+        if (source_entity.get("type", ""), target_entity.get("type", "")) in _RELIABLE_TYPE_PAIRS:
             confidence *= 1.2
             
         # Ensure confidence stays within bounds
@@ -216,70 +394,89 @@ class RelationExtractor:
         # Find entities that appear close to each other
         window_size = 50  # characters
         
-        for i, entity1 in enumerate(entities):
-            for entity2 in entities[i+1:]:
-                distance = abs(entity1["start"] - entity2["start"])
+        # Pull the fields the pair loop needs into parallel columns once
+        # instead of looking them up on the entity dicts for every pair
+        starts = [entity["start"] for entity in entities]
+        types = [entity.get("type", "") for entity in entities]
+        
+        # Sweep the entities in order of position so only pairs inside the
+        # window are visited, then restore the original pair order, in which
+        # the earlier entity in the list is the source
+        order = sorted(range(len(entities)), key=starts.__getitem__)
+        sorted_starts = [starts[i] for i in order]
+        pairs = []
+        for a, i in enumerate(order):
+            start = sorted_starts[a]
+            for b in range(a + 1, len(order)):
+                distance = sorted_starts[b] - start
+                if distance > window_size:
+                    break
+                j = order[b]
+                pairs.append((i, j, distance) if i < j else (j, i, distance))
+        pairs.sort()
+        
+        # The inferred type depends only on the two entity types and the
+        # text, so it is worked out once per type pair
+        text_lower = text.lower()
+        inferred_types: Dict[Tuple[str, str], Optional[str]] = {}
+        
+        for i, j, distance in pairs:
+            # Determine relation type based on entity types
+            type_pair = (types[i], types[j])
+            if type_pair not in inferred_types:
+                inferred_types[type_pair] = self._infer_relation_type(entities[i], entities[j], text_lower)
+            relation_type = inferred_types[type_pair]
+            
+            if relation_type:
+                relation = {
+                    "type": relation_type,
+                    "source": entities[i],
+                    "target": entities[j],
+                    "confidence": 0.4,  # Lower confidence for co-occurrence
+                    "distance": distance,
+                    "extraction_method": "cooccurrence"
+                }
+                relations.append(relation)
                 
-                if distance <= window_size:
-                    # Determine relation type based on entity types
-                    relation_type = self._infer_relation_type(entity1, entity2, text)
-                    
-                    if relation_type:
-                        relation = {
-                            "type": relation_type,
-                            "source": entity1,
-                            "target": entity2,
-                            "confidence": 0.4,  # Lower confidence for co-occurrence
-                            "distance": distance,
-                            "extraction_method": "cooccurrence"
-                        }
-                        relations.append(relation)
-                        
         return relations
         
-    def _infer_relation_type(self, entity1: Dict[str, Any], entity2: Dict[str, Any], text: str) -> Optional[str]:
-        """Infer relation type based on entity types and context"""
+    def _infer_relation_type(self, entity1: Dict[str, Any], entity2: Dict[str, Any],
+                             text_lower: str) -> Optional[str]:
+        """Infer relation type based on entity types and context (the lowercased text)"""
         
         type1 = entity1.get("type", "")
         type2 = entity2.get("type", "")
-        text_lower = text.lower()
         
         # Person-Organization relations
         if (type1 == "person" and type2 == "organization") or (type1 == "organization" and type2 == "person"):
-            if any(word in text_lower for word in ["work", "job", "employee", "staff"]):
+            if _WORK_CUES.search(text_lower):
                 return "works_for" if type1 == "person" else "employs"
                 
         # Organization-Location relations
         if (type1 == "organization" and type2 == "location") or (type1 == "location" and type2 == "organization"):
-            if any(word in text_lower for word in ["located", "based", "headquarters"]):
+            if _LOCATION_CUES.search(text_lower):
                 return "located_in" if type1 == "organization" else "contains"
                 
         # Person-Person relations
         if type1 == "person" and type2 == "person":
-            if any(word in text_lower for word in ["family", "married", "parent", "child"]):
+            if _FAMILY_CUES.search(text_lower):
                 return "related_to"
                 
         return "associated_with"  # Generic relation
         
     def _remove_duplicate_relations(self, relations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Remove duplicate relations"""
-        
-        unique_relations = []
-        seen_relations = set()
+        """Remove duplicate relations, keeping the most confident of each"""
         
+        # Keyed by source, target, and type; a later duplicate replaces the
+        # kept one only if it is more confident
+        best_relations: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
         for relation in relations:
-            # Create a key based on source, target, and type
-            source_id = relation["source"]["text"]
-            target_id = relation["target"]["text"]
-            relation_type = relation["type"]
-            
-            relation_key = (source_id, target_id, relation_type)
-            
-            if relation_key not in seen_relations:
-                unique_relations.append(relation)
-                seen_relations.add(relation_key)
+            relation_key = (relation["source"]["text"], relation["target"]["text"], relation["type"])
+            current = best_relations.get(relation_key)
+            if current is None or relation["confidence"] > current["confidence"]:
+                best_relations[relation_key] = relation
                 
-        return unique_relations
+        return list(best_relations.values())
         
     def get_relation_statistics(self, relations: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Get statistics about extracted relations"""
@@ -287,26 +484,13 @@ class RelationExtractor:
         if not relations:
             return {"total_relations": 0}
             
-        # Count by type
-        type_counts = {}
-        for relation in relations:
-            relation_type = relation["type"]
-            type_counts[relation_type] = type_counts.get(relation_type, 0) + 1
-            
-        # Average confidence
-        confidences = [r["confidence"] for r in relations]
-        avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+        # Pull the needed fields out column-wise in one pass
+        types, confidences, methods = zip(*map(_STAT_FIELDS, relations))
         
-        # Extraction methods
-        methods = {}
-        for relation in relations:
-            method = relation["extraction_method"]
-            methods[method] = methods.get(method, 0) + 1
-            
         return {
             "total_relations": len(relations),
-            "type_distribution": type_counts,
-            "average_confidence": avg_confidence,
-            "extraction_methods": methods,
-            "high_confidence_relations": len([r for r in relations if r["confidence"] > 0.7])
+            "type_distribution": dict(Counter(types)),
+            "average_confidence": sum(confidences) / len(confidences),
+            "extraction_methods": dict(Counter(methods)),
+            "high_confidence_relations": sum(confidence > 0.7 for confidence in confidences)
         }
@@ -2,11 +2,58 @@
 Adaptation engine for dynamic behavior adjustment
 """
 
+import re
+import time
+from collections import deque
+from functools import lru_cache
 from typing import Dict, Any, List, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
 import numpy as np
 from loguru import logger
 
+# Number of recent adaptations kept in the history
+MAX_ADAPTATION_HISTORY = 100
+
+# Adaptations within this many seconds count as recent
+RECENT_ADAPTATION_SECONDS = 24 * 60 * 60
+
+# Maximum number of transformed responses kept by apply_settings_to_response
+MAX_CACHED_RESPONSES = 4096
+
+# Phrase replacements for casual and formal responses, each applied in a
+# single pass over the response. Phrases match anywhere, as with str.replace;
+# no phrase overlaps another or appears in a replacement, so one pass gives
+# the same result as replacing the phrases one after another.
+_CASUAL_REPLACEMENTS = {
+    "I understand": "Got it",
+    "Therefore": "So",
+    "However": "But",
+    "Furthermore": "Also",
+    "consequently": "so"
+}
+_FORMAL_REPLACEMENTS = {
+    "Got it": "I understand",
+    "So": "Therefore",
+    "But": "However",
+    "Also": "Furthermore",
+    "yeah": "yes",
+    "gonna": "going to"
+}
+_CASUAL_RE = re.compile("|".join(map(re.escape, _CASUAL_REPLACEMENTS)))
+_FORMAL_RE = re.compile("|".join(map(re.escape, _FORMAL_REPLACEMENTS)))
+
+# Parenthetical details, dropped from brief responses
+_PAREN_RE = re.compile(r'\([^)]*\)')
+
+
+def _setting_level(value: float) -> int:
+    """-1 for a low setting (below 0.4), 1 for a high one (above 0.6), else 0"""
+    if value < 0.4:
+        return -1
+    if value > 0.6:
+        return 1
+    return 0
+
 
 class AdaptationEngine:
     """Engine for adapting agent behavior based on learning and feedback"""
@@ -26,14 +73,23 @@ class AdaptationEngine:
             "detail_level": 0.5
         }
         
-        self.adaptation_history = []
+        self.adaptation_history: deque = deque(maxlen=MAX_ADAPTATION_HISTORY)
+        
+        # How many adaptations in the history adjusted each setting, kept in
+        # step with the history for get_adaptation_statistics
+        self._adjustment_counts: Dict[str, int] = {}
+        
+        # Transformed responses by response and setting levels; a setting
+        # only matters through which side of 0.4 and 0.6 it is on, so the
+        # cache stays valid as settings change
+        self._transform_response = lru_cache(maxsize=MAX_CACHED_RESPONSES)(self._transform_response)
         self.performance_window = 20  # Number of recent interactions to consider
         
     def adapt(self, feedback: Dict[str, Any], performance_metrics: Dict[str, float]) -> Dict[str, Any]:
         """Adapt agent behavior based on feedback and performance"""
         
         adaptation = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": time.time(),
             "trigger_feedback": feedback,
             "trigger_metrics": performance_metrics,
             "adjustments": {},
@@ -58,12 +114,15 @@ class AdaptationEngine:
         # Record rationale
         adaptation["rationale"] = self._generate_adaptation_rationale(needed_adjustments)
         
-        # Store adaptation
+        # Store adaptation, uncounting the oldest one if it drops out
+        if len(self.adaptation_history) == self.adaptation_history.maxlen:
+            for adj_type in self.adaptation_history[0]["adjustments"]:
+                self._adjustment_counts[adj_type] -= 1
+                if not self._adjustment_counts[adj_type]:
+                    del self._adjustment_counts[adj_type]
         self.adaptation_history.append(adaptation)
-        
-        # Keep only recent adaptations
-        if len(self.adaptation_history) > 100:
-            self.adaptation_history = self.adaptation_history[-100:]
+        for adj_type in adaptation["adjustments"]:
+            self._adjustment_counts[adj_type] = self._adjustment_counts.get(adj_type, 0) + 1
             
         logger.info(f"Applied {len(adaptation['adjustments'])} adaptations")
         return adaptation
@@ -94,23 +153,25 @@ class AdaptationEngine:
             needs["response_length"] = -0.1  # Make responses shorter
             needs["detail_level"] = -0.1     # Reduce detail
             
-        # Adapt based on feedback aspects
+        # Adapt based on feedback aspects. Later rules override earlier ones
+        # for the same setting, so the order of the checks matters.
         aspects = feedback.get("aspects", [])
+        negative = sentiment == "negative"
         
         if "clarity" in aspects:
-            if sentiment == "negative":
+            if negative:
                 needs["response_length"] = -0.2  # Shorter, clearer responses
                 needs["detail_level"] = -0.1
             else:
                 needs["detail_level"] = 0.1     # More detail for clarity
                 
         if "helpfulness" in aspects:
-            if sentiment == "negative":
+            if negative:
                 needs["detail_level"] = 0.2     # Increase detail
                 needs["response_length"] = 0.1  # Longer responses
                 
         if "tone" in aspects:
-            if sentiment == "negative":
+            if negative:
                 needs["formality"] = 0.1        # Increase formality
                 
         # Adapt based on rating
@@ -171,6 +232,11 @@ class AdaptationEngine:
                     
         return rationale
         
+    @staticmethod
+    def iso_timestamp(adaptation: Dict[str, Any]) -> str:
+        """When an adaptation was made, as a local ISO 8601 string"""
+        return datetime.fromtimestamp(adaptation["timestamp"]).isoformat()
+        
     def get_current_settings(self) -> Dict[str, float]:
         """Get current adaptation settings"""
         return self.current_settings.copy()
@@ -178,27 +244,33 @@ class AdaptationEngine:
     def apply_settings_to_response(self, base_response: str) -> str:
         """Apply current settings to modify a response"""
         
-        response = base_response
+        return self._transform_response(
+            base_response,
+            _setting_level(self.current_settings["response_length"]),
+            _setting_level(self.current_settings["detail_level"]),
+            _setting_level(self.current_settings["formality"])
+        )
+        
+    def _transform_response(self, response: str, length_level: int, detail_level: int,
+                            formality_level: int) -> str:
+        """Modify a response for the given setting levels (see _setting_level)"""
         
         # Apply response length adjustment
-        length_setting = self.current_settings["response_length"]
-        if length_setting < 0.4:  # Short
+        if length_level < 0:  # Short
             response = self._shorten_response(response)
-        elif length_setting > 0.6:  # Long
+        elif length_level > 0:  # Long
             response = self._lengthen_response(response)
             
         # Apply detail level adjustment
-        detail_setting = self.current_settings["detail_level"]
-        if detail_setting < 0.4:  # Brief
+        if detail_level < 0:  # Brief
             response = self._reduce_detail(response)
-        elif detail_setting > 0.6:  # Detailed
+        elif detail_level > 0:  # Detailed
             response = self._add_detail(response)
             
         # Apply formality adjustment
-        formality_setting = self.current_settings["formality"]
-        if formality_setting < 0.4:  # Casual
+        if formality_level < 0:  # Casual
             response = self._make_casual(response)
-        elif formality_setting > 0.6:  # Formal
+        elif formality_level > 0:  # Formal
             response = self._make_formal(response)
             
         return response
@@ -220,8 +292,7 @@ class AdaptationEngine:
     def _reduce_detail(self, response: str) -> str:
         """Reduce detail in response"""
         # Simple implementation - remove parenthetical details
-        import re
-        response = re.sub(r'\([^)]*\)', '', response)
+        response = _PAREN_RE.sub('', response)
         return response.strip()
         
     def _add_detail(self, response: str) -> str:
@@ -233,34 +304,11 @@ class AdaptationEngine:
         
     def _make_casual(self, response: str) -> str:
         """Make response more casual"""
-        casual_replacements = {
-            "I understand": "Got it",
-            "Therefore": "So",
-            "However": "But",
-            "Furthermore": "Also",
-            "consequently": "so"
-        }
-        
-        for formal, casual in casual_replacements.items():
-            response = response.replace(formal, casual)
-            
-        return response
+        return _CASUAL_RE.sub(lambda match: _CASUAL_REPLACEMENTS[match.group()], response)
         
     def _make_formal(self, response: str) -> str:
         """Make response more formal"""
-        formal_replacements = {
-            "Got it": "I understand",
-            "So": "Therefore",
-            "But": "However",
-            "Also": "Furthermore",
-            "yeah": "yes",
-            "gonna": "going to"
-        }
-        
-        for casual, formal in formal_replacements.items():
-            response = response.replace(casual, formal)
-            
-        return response
+        return _FORMAL_RE.sub(lambda match: _FORMAL_REPLACEMENTS[match.group()], response)
         
     def get_adaptation_statistics(self) -> Dict[str, Any]:
         """Get statistics about adaptations"""
@@ -272,30 +320,30 @@ class AdaptationEngine:
             }
             
         total_adaptations = len(self.adaptation_history)
+        now = time.time()
         
         # Calculate adaptation frequency (adaptations per day)
         if total_adaptations > 1:
-            first_adaptation = datetime.fromisoformat(self.adaptation_history[0]["timestamp"])
-            days_since_first = (datetime.now() - first_adaptation).days
+            days_since_first = int((now - self.adaptation_history[0]["timestamp"]) // RECENT_ADAPTATION_SECONDS)
             frequency = total_adaptations / max(1, days_since_first)
         else:
             frequency = 0.0
             
-        # Analyze common adjustments
-        adjustment_counts = {}
-        for adaptation in self.adaptation_history:
-            for adj_type in adaptation["adjustments"].keys():
-                adjustment_counts[adj_type] = adjustment_counts.get(adj_type, 0) + 1
-                
+        # Adaptations are in time order, so the recent ones are counted back
+        # from the newest
+        cutoff = now - RECENT_ADAPTATION_SECONDS
+        recent_adaptations = 0
+        for adaptation in reversed(self.adaptation_history):
+            if adaptation["timestamp"] <= cutoff:
+                break
+            recent_adaptations += 1
+            
         return {
             "total_adaptations": total_adaptations,
             "adaptation_frequency": frequency,
-            "common_adjustments": adjustment_counts,
+            "common_adjustments": dict(self._adjustment_counts),
             "current_settings": self.current_settings,
-            "recent_adaptations": len([
-                a for a in self.adaptation_history
-                if datetime.fromisoformat(a["timestamp"]) > datetime.now() - timedelta(days=1)
-            ])
+            "recent_adaptations": recent_adaptations
         }
         
     def reset_adaptations(self) -> None:
@@ -311,5 +359,6 @@ class AdaptationEngine:
         }
         
         self.adaptation_history.clear()
+        self._adjustment_counts.clear()
         
         logger.info("Adaptations reset completed")
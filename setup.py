@@ -29,6 +29,17 @@ setup(
     ],
     python_requires=">=3.8",
     install_requires=requirements,
+    extras_require={
+        # Optional accelerators, each used when installed in place of a pure-Python path
+        "fast": [
+            "orjson",
+            "pyahocorasick",
+            "hyperscan; platform_machine == 'x86_64'",
+            "msgpack",
+            "zstandard",
+            "xxhash",
+        ],
+    },
     entry_points={
         "console_scripts": [
             "agent=agent.cli:main",
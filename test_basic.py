@@ -4,6 +4,11 @@ Basic test for the Advanced AI Agent without heavy dependencies
 
 import sys
 import os
+import atexit
+import tempfile
+import threading
+
+import pytest
 
 # Add the parent directory to the path so we can import the agent
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -120,6 +125,521 @@ def test_memory_system():
         return False
 
 
+def test_agent_state_round_trip():
+    """Test that agent state survives dumps() and from_bytes()"""
+    
+    print("\n🧪 Testing Agent State Round Trip")
+    print("=" * 40)
+    
+    from agent.core.state import AgentState, AgentMode, EmotionalState
+    
+    state = AgentState()
+    state.update_mode(AgentMode.LEARNING)
+    state.update_emotional_state(EmotionalState.CURIOUS)
+    state.set_current_task("testing")
+    state.add_context("user", {"name": "Test", "scores": (1, 2)})
+    state.add_context("preferences", {1: "first", 2.5: "second"})
+    state.add_interaction({"input": "hello", "response": "hi"})
+    state.update_performance_metric("response_time", 0.25)
+    state.update_performance_metric(3, 1.0)
+    
+    restored = AgentState.from_bytes(state.dumps())
+    
+    assert restored.mode == AgentMode.LEARNING
+    assert restored.emotional_state == EmotionalState.CURIOUS
+    assert restored.current_task == "testing"
+    assert restored.last_updated == state.last_updated
+    assert restored.context["user"] == {"name": "Test", "scores": [1, 2]}
+    # Keys that are not strings come back as strings, as with json
+    assert restored.context["preferences"] == {"1": "first", "2.5": "second"}
+    assert list(restored.interaction_history) == list(state.interaction_history)
+    assert restored.performance_metrics == {"response_time": 0.25, "3": 1.0}
+    print("✓ State restored from its serialized form")
+    
+    return True
+
+
+def test_knowledge_graph_replayed_version():
+    """Test that a restart replays each logged change exactly once"""
+    
+    print("\n🧪 Testing Knowledge Graph Replay")
+    print("=" * 40)
+    
+    from agent.core.config import KnowledgeConfig
+    from agent.knowledge.knowledge_graph import KnowledgeGraph
+    
+    with tempfile.TemporaryDirectory() as memory_path:
+        kg = KnowledgeGraph(KnowledgeConfig(), memory_path)
+        
+        # Snapshot continuously while the graph changes
+        stop = threading.Event()
+        def snapshot_loop():
+            while not stop.is_set():
+                kg.flush()
+        snapshotter = threading.Thread(target=snapshot_loop)
+        snapshotter.start()
+        
+        entity_ids = [kg.add_entity({"name": f"entity {i}"}) for i in range(300)]
+        for source_id, target_id in zip(entity_ids, entity_ids[1:]):
+            kg.add_relation({"source": source_id, "target": target_id})
+        for entity_id in entity_ids[::3]:
+            kg.remove_entity(entity_id)
+            
+        stop.set()
+        snapshotter.join()
+        
+        # One change after the last snapshot, left for the op-log
+        kg.add_entity({"name": "logged only"})
+        
+        reloaded = KnowledgeGraph(KnowledgeConfig(), memory_path)
+        assert reloaded.version == kg.version
+        assert set(reloaded.entities) == set(kg.entities)
+        assert set(reloaded.relations) == set(kg.relations)
+        print(f"✓ Reloaded version {reloaded.version} matches")
+        
+        reloaded.flush()
+        kg.flush()
+        
+    return True
+
+
+def test_knowledge_graph_save_reload_replay():
+    """Test that a reload restores the snapshot and replays later changes"""
+    
+    print("\n🧪 Testing Knowledge Graph Save and Reload")
+    print("=" * 40)
+    
+    from agent.core.config import KnowledgeConfig
+    from agent.knowledge.knowledge_graph import KnowledgeGraph
+    
+    with tempfile.TemporaryDirectory() as memory_path:
+        kg = KnowledgeGraph(KnowledgeConfig(), memory_path)
+        python_id = kg.add_entity({"name": "Python", "type": "language", "attributes": {"paradigm": "multi"}})
+        guido_id = kg.add_entity({"name": "Guido van Rossum", "type": "person"})
+        kg.add_relation({"source": python_id, "target": guido_id, "type": "created_by"})
+        kg.flush()
+        
+        # Changes after the snapshot only reach the op-log
+        netherlands_id = kg.add_entity({"name": "Netherlands", "type": "place"})
+        born_in_id = kg.add_relation({"source": guido_id, "target": netherlands_id, "type": "born_in"})
+        temporary_id = kg.add_entity({"name": "Temporary"})
+        kg.remove_entity(temporary_id)
+        
+        reloaded = KnowledgeGraph(KnowledgeConfig(), memory_path)
+        assert set(reloaded.entities) == {python_id, guido_id, netherlands_id}
+        assert set(reloaded.relations) == set(kg.relations)
+        assert reloaded.relations[born_in_id]["type"] == "born_in"
+        assert reloaded.version == kg.version
+        assert reloaded.find_entities_by_attribute("paradigm", "multi")[0]["id"] == python_id
+        assert [e["id"] for e in reloaded.query("netherlands")] == [netherlands_id]
+        print(f"✓ Reloaded {len(reloaded.entities)} entities at version {reloaded.version}")
+        
+        reloaded.flush()
+        kg.flush()
+        
+    return True
+
+
+def test_knowledge_graph_interrupted_snapshot():
+    """Test that changes survive a snapshot that stopped after rotating the op-log"""
+    
+    print("\n🧪 Testing Knowledge Graph Interrupted Snapshot")
+    print("=" * 40)
+    
+    from agent.core.config import KnowledgeConfig
+    from agent.knowledge.knowledge_graph import KnowledgeGraph
+    
+    with tempfile.TemporaryDirectory() as memory_path:
+        kg = KnowledgeGraph(KnowledgeConfig(), memory_path)
+        first_id = kg.add_entity({"name": "Snapshotted"})
+        kg.flush()
+        
+        # Rotate the log as a snapshot would, then stop before writing it
+        rotated_id = kg.add_entity({"name": "Rotated"})
+        kg._rotate_op_log()
+        assert os.path.exists(kg._previous_log_file)
+        later_id = kg.add_entity({"name": "Logged later"})
+        kg.add_relation({"source": rotated_id, "target": later_id})
+        
+        reloaded = KnowledgeGraph(KnowledgeConfig(), memory_path)
+        assert set(reloaded.entities) == {first_id, rotated_id, later_id}
+        assert set(reloaded.relations) == set(kg.relations)
+        assert reloaded.version == kg.version
+        print("✓ Changes in the previous and current op-logs were replayed")
+        
+        # The next snapshot covers both logs and removes the previous one
+        reloaded.flush()
+        assert not os.path.exists(reloaded._previous_log_file)
+        assert set(KnowledgeGraph(KnowledgeConfig(), memory_path).entities) == set(reloaded.entities)
+        
+        kg.flush()
+        
+    return True
+
+
+def test_knowledge_graph_timestamp_round_trip():
+    """Test that entity and relation timestamps reload as datetimes"""
+    
+    print("\n🧪 Testing Knowledge Graph Timestamps")
+    print("=" * 40)
+    
+    from datetime import datetime
+    from agent.core.config import KnowledgeConfig
+    from agent.knowledge.knowledge_graph import KnowledgeGraph
+    
+    with tempfile.TemporaryDirectory() as memory_path:
+        kg = KnowledgeGraph(KnowledgeConfig(), memory_path)
+        source_id = kg.add_entity({"name": "Source"})
+        target_id = kg.add_entity({"name": "Target"})
+        relation_id = kg.add_relation({"source": source_id, "target": target_id})
+        kg.get_entity(source_id)
+        
+        # Once from the op-log, once from a snapshot
+        for snapshot in (False, True):
+            if snapshot:
+                kg.flush()
+            reloaded = KnowledgeGraph(KnowledgeConfig(), memory_path)
+            for entity_id in (source_id, target_id):
+                entity, original = reloaded.entities[entity_id], kg.entities[entity_id]
+                assert isinstance(entity.created_at, datetime)
+                assert isinstance(entity.last_accessed, datetime)
+                assert entity.created_at == original.created_at
+            relation = reloaded.relations[relation_id]
+            assert isinstance(relation["created_at"], datetime)
+            assert relation["created_at"] == kg.relations[relation_id]["created_at"]
+            reloaded.to_dict()
+            reloaded.flush()
+            
+        # Access times are only kept by snapshots
+        assert reloaded.entities[source_id].last_accessed == kg.entities[source_id].last_accessed
+        print("✓ Timestamps reloaded as datetimes")
+        
+    return True
+
+
+def test_knowledge_graph_related_entities():
+    """Test the breadth-first search for related entities"""
+    
+    print("\n🧪 Testing Knowledge Graph Related Entities")
+    print("=" * 40)
+    
+    from agent.core.config import KnowledgeConfig
+    from agent.knowledge.knowledge_graph import KnowledgeGraph
+    
+    with tempfile.TemporaryDirectory() as memory_path:
+        kg = KnowledgeGraph(KnowledgeConfig(), memory_path)
+        for entity_id in ("a", "b", "c", "d", "x", "y"):
+            kg.add_entity({"id": entity_id, "name": entity_id})
+            
+        # a -knows-> b -knows-> c -knows-> d, a -likes-> x -knows-> y
+        kg.add_relation({"source": "a", "target": "b", "type": "knows"})
+        kg.add_relation({"source": "b", "target": "c", "type": "knows"})
+        kg.add_relation({"source": "c", "target": "d", "type": "knows"})
+        likes_id = kg.add_relation({"source": "a", "target": "x", "type": "likes"})
+        kg.add_relation({"source": "x", "target": "y", "type": "knows", "bidirectional": True})
+        
+        related = kg.find_related_entities("a")
+        distances = {e["id"]: e["relationship_distance"] for e in related}
+        assert distances == {"b": 1, "x": 1, "c": 2, "y": 2}
+        assert [e["relationship_distance"] for e in related] == sorted(distances.values())
+        assert all(e["relationship_strength"] == 1.0 / (e["relationship_distance"] + 1) for e in related)
+        print(f"✓ Found {len(related)} entities within two hops")
+        
+        # Only paths made entirely of allowed relations count
+        related = kg.find_related_entities("a", relation_types=["knows"], max_depth=3)
+        assert [e["id"] for e in related] == ["b", "c", "d"]
+        
+        # Reverse edges of bidirectional relations are followed
+        assert [e["id"] for e in kg.find_related_entities("y", max_depth=1)] == ["x"]
+        
+        # Relation changes are seen by later searches
+        kg.remove_relation(likes_id)
+        assert {e["id"] for e in kg.find_related_entities("a")} == {"b", "c"}
+        assert kg.find_related_entities("missing") == []
+        print("✓ Relation type filtering and updates respected")
+        
+        kg.flush()
+        
+    return True
+
+
+def test_knowledge_graph_eviction():
+    """Test that a full knowledge graph evicts its least important items"""
+    
+    print("\n🧪 Testing Knowledge Graph Eviction")
+    print("=" * 40)
+    
+    from agent.core.config import KnowledgeConfig
+    from agent.knowledge.knowledge_graph import KnowledgeGraph
+    
+    with tempfile.TemporaryDirectory() as memory_path:
+        kg = KnowledgeGraph(KnowledgeConfig(max_entities=3, max_relations=2), memory_path)
+        kg.add_entity({"id": "high", "importance": 0.9})
+        kg.add_entity({"id": "low", "importance": 0.2})
+        kg.add_entity({"id": "mid", "importance": 0.5})
+        
+        kg.add_entity({"id": "new1", "importance": 0.6})
+        assert set(kg.entities) == {"high", "mid", "new1"}
+        
+        # Accesses raise an entity's score: 0.5 * (1 + 10 * 0.1) beats 0.6
+        for _ in range(10):
+            kg.get_entity("mid")
+        kg.add_entity({"id": "new2", "importance": 0.7})
+        assert set(kg.entities) == {"high", "mid", "new2"}
+        
+        # Entities removed directly leave stale heap entries that are skipped
+        kg.remove_entity("new2")
+        kg.add_entity({"id": "new3", "importance": 0.1})
+        kg.add_entity({"id": "new4", "importance": 0.95})
+        assert set(kg.entities) == {"high", "mid", "new4"}
+        print("✓ Least important entities evicted")
+        
+        kg.add_relation({"source": "high", "target": "mid", "importance": 0.3})
+        kept_id = kg.add_relation({"source": "mid", "target": "new4", "importance": 0.8})
+        new_id = kg.add_relation({"source": "new4", "target": "high", "importance": 0.5})
+        assert set(kg.relations) == {kept_id, new_id}
+        print("✓ Least important relation evicted")
+        
+        kg.flush()
+        
+    return True
+
+
+def test_entity_dictionary_whole_words():
+    """Test that dictionary entities only match whole words"""
+    
+    print("\n🧪 Testing Dictionary Entity Matching")
+    print("=" * 40)
+    
+    from agent.knowledge.entity_extractor import EntityExtractor
+    
+    extractor = EntityExtractor()
+    text = "AIDS research is Good. I use AI, C++ and Go with JavaScript on AWS."
+    found = [
+        (entity["text"], entity["type"], entity["start"])
+        for entity in extractor.extract_entities(text)
+        if entity["extraction_method"] == "dictionary"
+    ]
+    
+    assert found == [
+        ("AI", "technology", text.index("AI,")),
+        ("C++", "technology", text.index("C++")),
+        ("Go", "technology", text.index("Go ")),
+        ("JavaScript", "technology", text.index("JavaScript")),
+        ("AWS", "technology", text.index("AWS")),
+    ]
+    print(f"✓ Found {len(found)} whole-word dictionary entities")
+    
+    return True
+
+
+def test_reasoning_deduplicates_results():
+    """Test that inference keeps the most relevant result per id"""
+    
+    print("\n🧪 Testing Reasoning Result Deduplication")
+    print("=" * 40)
+    
+    from agent.knowledge.reasoning_engine import ReasoningEngine
+    
+    class QueryOnlyGraph:
+        """Knowledge graph stand-in that answers every query with fixed results"""
+        version = 0
+        
+        def __init__(self, results):
+            self.results = results
+            
+        def query(self, query_text):
+            return [dict(result) for result in self.results]
+            
+    graph = QueryOnlyGraph([
+        {"id": "r1", "type": "relation", "relevance": 0.4},
+        {"id": "r1", "type": "relation", "relevance": 0.9},
+        {"id": "r1", "type": "relation", "relevance": 0.6},
+        {"id": "r2", "type": "relation", "relevance": 0.5},
+        {"type": "relation", "relevance": 0.3},
+        {"type": "relation", "relevance": 0.2},
+    ])
+    engine = ReasoningEngine(graph)
+    engine.add_rule({"id": "wet", "name": "wet", "premises": ["rain"], "conclusion": "ground is wet"})
+    
+    results = engine.infer("rain today")
+    assert [(r.get("id"), r["relevance"]) for r in results] == [
+        ("r1", 0.9), ("inference_wet", 0.7), ("r2", 0.5), (None, 0.3), (None, 0.2)
+    ]
+    print("✓ Most relevant result kept per id; results without an id all kept")
+    
+    # At most ten results, the most relevant ones
+    graph.results = [{"id": f"e{i}", "type": "relation", "relevance": i / 20} for i in range(15)]
+    results = engine.infer("anything else")
+    assert [r["id"] for r in results] == [f"e{i}" for i in range(14, 4, -1)]
+    
+    return True
+
+
+# The tests below run the code paths of the optional accelerators (the
+# "fast" extra) and are skipped when the library is not installed
+
+
+def test_entity_extractor_ahocorasick():
+    """Test that the Aho-Corasick dictionary scan matches the regex fallback"""
+    
+    pytest.importorskip("ahocorasick")
+    from agent.knowledge.entity_extractor import EntityExtractor
+    
+    extractor = EntityExtractor()
+    assert extractor._automaton is not None
+    
+    texts = [
+        "AIDS research is Good. I use AI, C++ and Go with JavaScript on AWS.",
+        "Machine Learning and Deep Learning at Google Cloud, with Python and PyTorch.",
+        "The CEO met Einstein and Newton; Java, JavaScript and Rust.",
+        "",
+    ]
+    with_automaton = [extractor.extract_entities(text) for text in texts]
+    extractor._automaton = None
+    assert [extractor.extract_entities(text) for text in texts] == with_automaton
+
+
+def test_relation_extractor_optional_matchers(monkeypatch):
+    """Test that the hyperscan gates and Aho-Corasick entity index change no results"""
+    
+    from agent.knowledge import relation_extractor
+    from agent.knowledge.entity_extractor import EntityExtractor
+    from agent.knowledge.relation_extractor import RelationExtractor
+    
+    texts = [
+        "John Smith works at Acme Corp and lives in London.",
+        "Python is a programming language created by Guido van Rossum.",
+        "Marie Curie was born in Warsaw. Marie Curie discovered polonium.",
+        "Nothing related here at all.",
+    ]
+    entity_extractor = EntityExtractor()
+    entities = [entity_extractor.extract_entities(text) for text in texts]
+    
+    def extract_all():
+        extractor = RelationExtractor()
+        return extractor, [
+            extractor.extract_relations(text, text_entities)
+            for text, text_entities in zip(texts, entities)
+        ]
+        
+    extractor, expected = extract_all()
+    
+    if relation_extractor.HYPERSCAN_AVAILABLE:
+        assert extractor._gate_database is not None
+        extractor._gate_database = None
+        assert [
+            extractor.extract_relations(text, text_entities)
+            for text, text_entities in zip(texts, entities)
+        ] == expected
+        
+    if relation_extractor.AHOCORASICK_AVAILABLE:
+        monkeypatch.setattr(relation_extractor, "AHOCORASICK_AVAILABLE", False)
+        assert extract_all()[1] == expected
+        
+    if not (relation_extractor.HYPERSCAN_AVAILABLE or relation_extractor.AHOCORASICK_AVAILABLE):
+        pytest.skip("neither hyperscan nor ahocorasick is installed")
+
+
+def test_reasoning_premise_automaton(monkeypatch):
+    """Test that matching rule premises with Aho-Corasick finds the same rules"""
+    
+    pytest.importorskip("ahocorasick")
+    from agent.knowledge import reasoning_engine
+    from agent.knowledge.reasoning_engine import ReasoningEngine
+    
+    class EmptyGraph:
+        """Knowledge graph stand-in without any knowledge"""
+        version = 0
+        
+        def query(self, query_text):
+            return []
+            
+    rule_sets = [
+        [{"id": "always", "premises": [""], "conclusion": "always applies"}],
+        [
+            {"id": "wet", "premises": ["rain"], "conclusion": "ground is wet"},
+            {"id": "cold", "premises": ["snow", "ice"], "conclusion": "it is cold"},
+            {"id": "always", "premises": [""], "conclusion": "always applies"},
+        ],
+    ]
+    queries = ["Rain and SNOW", "ice", "sunny", ""]
+    
+    def infer_all(rules):
+        engine = ReasoningEngine(EmptyGraph())
+        for rule in rules:
+            engine.add_rule(rule)
+        return [engine.infer(query) for query in queries]
+        
+    with_automaton = [infer_all(rules) for rules in rule_sets]
+    monkeypatch.setattr(reasoning_engine, "AHOCORASICK_AVAILABLE", False)
+    assert [infer_all(rules) for rules in rule_sets] == with_automaton
+
+
+@pytest.mark.parametrize("module_name", ["msgpack", "zstandard"])
+def test_knowledge_graph_storage_formats(module_name, monkeypatch):
+    """Test snapshots and op-logs in the optional formats, and reading older JSON ones"""
+    
+    pytest.importorskip(module_name)
+    from datetime import datetime
+    from agent.core.config import KnowledgeConfig
+    from agent.knowledge import knowledge_graph as kgm
+    
+    extension = ".msgpack" if module_name == "msgpack" else ".zst"
+    
+    with tempfile.TemporaryDirectory() as memory_path:
+        # Written before the library was installed: a JSON snapshot and op-log
+        with monkeypatch.context() as m:
+            m.setattr(kgm, "MSGPACK_AVAILABLE", False)
+            m.setattr(kgm, "ZSTD_AVAILABLE", False)
+            kg = kgm.KnowledgeGraph(KnowledgeConfig(), memory_path)
+            json_id = kg.add_entity({"name": "From JSON"})
+            kg.flush()
+            logged_id = kg.add_entity({"name": "Logged as JSON"})
+            
+        # That process ends without a final snapshot
+        atexit.unregister(kg.flush)
+        
+        reloaded = kgm.KnowledgeGraph(KnowledgeConfig(), memory_path)
+        assert set(reloaded.entities) == {json_id, logged_id}
+        assert reloaded.version == kg.version
+        
+        # Written with the library: snapshot, then logged changes
+        new_id = reloaded.add_entity({"name": "New"})
+        reloaded.add_relation({"source": json_id, "target": new_id})
+        reloaded.flush()
+        assert kgm._data_file(memory_path, "entities", for_load=True).endswith(
+            extension if module_name == "zstandard" else (extension, extension + ".zst")
+        )
+        reloaded.remove_entity(logged_id)
+        
+        restored = kgm.KnowledgeGraph(KnowledgeConfig(), memory_path)
+        assert set(restored.entities) == {json_id, new_id}
+        assert set(restored.relations) == set(reloaded.relations)
+        assert restored.version == reloaded.version
+        assert isinstance(restored.entities[new_id].created_at, datetime)
+        assert restored.entities[new_id].created_at == reloaded.entities[new_id].created_at
+        
+        restored.flush()
+        reloaded.flush()
+
+
+def test_knowledge_graph_xxhash_ids():
+    """Test that generated ids use xxhash when it is installed"""
+    
+    xxhash = pytest.importorskip("xxhash")
+    from agent.knowledge import knowledge_graph as kgm
+    
+    assert kgm._hash_id(b"knowledge") == xxhash.xxh3_64_hexdigest(b"knowledge")
+    
+    with tempfile.TemporaryDirectory() as memory_path:
+        kg = kgm.KnowledgeGraph(kgm.KnowledgeConfig(), memory_path)
+        ids = [kg.add_entity({"name": str(i)}) for i in range(100)]
+        assert len(set(ids)) == len(ids)
+        assert all(len(entity_id) == len("entity_") + 16 for entity_id in ids)
+        kg.flush()
+
+
 def main():
     """Run all basic tests"""
     
@@ -129,7 +649,16 @@ def main():
     tests = [
         ("Basic Imports", test_basic_imports),
         ("Basic Functionality", test_basic_functionality),
-        ("Memory System", test_memory_system)
+        ("Memory System", test_memory_system),
+        ("Agent State Round Trip", test_agent_state_round_trip),
+        ("Knowledge Graph Replay", test_knowledge_graph_replayed_version),
+        ("Knowledge Graph Save and Reload", test_knowledge_graph_save_reload_replay),
+        ("Knowledge Graph Interrupted Snapshot", test_knowledge_graph_interrupted_snapshot),
+        ("Knowledge Graph Timestamps", test_knowledge_graph_timestamp_round_trip),
+        ("Knowledge Graph Related Entities", test_knowledge_graph_related_entities),
+        ("Knowledge Graph Eviction", test_knowledge_graph_eviction),
+        ("Dictionary Entity Matching", test_entity_dictionary_whole_words),
+        ("Reasoning Result Deduplication", test_reasoning_deduplicates_results)
     ]
     
     passed = 0